@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
+import operator
 from armet.utils import compose
 from collections import defaultdict
 from functools import partial
@@ -37,6 +38,22 @@ class Attribute(object):
         #! Attribute is to be treated as a collection.
         self.collection = kwargs.get('collection', False)
 
+        #! Meaning of equality (`foo=bar`) on this attribute; one of
+        #! `exact`, `iexact`, `prefix` or `substring` (if `None`, the
+        #! `equality` of the resource). Equality on attributes that are
+        #! not text is always exact.
+        self.equality = kwargs.get('equality')
+
+        #! Operator that equality compares with; resolved from `equality`
+        #! by the resource the attribute is declared on.
+        self.equality_operator = None
+
+        #! Attribute may be searched (`foo.search=bar`) through a full-text
+        #! index; either `True` or the name of the index where the
+        #! connector requires one (eg. the FTS5 table on SQLite, which
+        #! otherwise defaults to `<table>_fts`).
+        self.search = kwargs.get('search')
+
         #! Override python name of the attribute.
         self.name = kwargs.get('name')
 
@@ -67,7 +84,7 @@ class Attribute(object):
         class GetResolver(dict):
 
             def __missing__(self, key):
-                return partial(this._resolve_get, self, key.__class__)
+                return partial(this._resolve_get, self, key)
 
         self._get = GetResolver()
 
@@ -105,9 +122,20 @@ class Attribute(object):
 
         # Have we finished resolving the getters?
         if not self._segments[key]:
-            # Compose a replacement get function that just iterates over
-            # the getters.
-            resolver[key] = compose(*self._getters[key])
+            # Make a replacement get function that just iterates over
+            # the getters (stopping at a null interim segment).
+            getters = self._getters[key]
+
+            def get(target):
+                for func in getters:
+                    if target is None:
+                        return None
+
+                    target = func(target)
+
+                return target
+
+            resolver[key] = get
 
         # Return our resolved value.
         return target
@@ -116,9 +144,31 @@ class Attribute(object):
         """Retrieve the value of this attribute from the passed object.
         """
 
-        # Attempt to resolve an accessor for the specific target. Creates
+        # Attempt to resolve an accessor for the type of the target. Creates
         # the accessor if not available.
-        return self._get[target](target)
+        return self._get[target.__class__](target)
+
+    def getter(self, class_):
+        """Build a function that retrieves the value of this attribute from
+        an instance of the passed class (as `get` does; without resolving
+        the accessor for each object).
+        """
+        if self.path is None:
+            # There is no path defined on this resource.
+            return lambda target: None
+
+        if '.' in self.path:
+            # Traversed paths resolve each segment on the object reached.
+            return self.get
+
+        # A data descriptor (eg. a mapped column or a property) is read
+        # through plain attribute access.
+        obj = getattr(class_, self.path, None)
+        if (obj is not None and not hasattr(obj, '__call__')
+                and hasattr(obj, '__get__') and hasattr(obj, '__set__')):
+            return operator.attrgetter(self.path)
+
+        return self._make_getter(self.path, class_)
 
     def set(self, target, value):
         """Set the value of this attribute for the passed object.
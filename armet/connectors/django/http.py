@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from armet import http
 from io import BytesIO
 import re
@@ -169,6 +169,17 @@ class Response(http.Response):
         # Set the underlying store.
         super(Response, Response).body.__set__(self, value)
 
+    def stream_handle(self, chunks):
+        """Builds a streaming response handle that sends the chunks as
+        they are produced (along with the status and headers set so far).
+        """
+        handle = StreamingHttpResponse(chunks, status=self.status)
+        for name, value in self._handle.items():
+            handle[name] = value
+
+        handle.cookies = self._handle.cookies
+        return handle
+
     def close(self):
         # Perform general clean-up and a final flush.
         super(Response, self).close()
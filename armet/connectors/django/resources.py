@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
+import re
+import json
 import operator
+import collections
 import six
 from six.moves import map, reduce
 from django.conf import urls
-from django.db.models import Q
+from django.db import connections
+from django.db.models import Q, Count, Sum, Avg, Min, Max
+from django.db.models.query import QuerySet, prefetch_related_objects
 from django.views.decorators import csrf
 from armet import utils
 from . import http
 from armet.query import parser, Query, QuerySegment, constants
+from armet.http import exceptions
 
 
 class Resource(object):
@@ -28,13 +34,18 @@ class Resource(object):
             import gevent
             gevent.spawn(super(Resource, cls).view, request, response)
 
-            # Construct and return the generator response.
-            response._handle.content = cls.stream(response, response)
-            return response._handle
+            # Hand the stream to django once the first chunk (along with
+            # the status and headers) is written.
+            return response.stream_handle(cls.stream(response, response))
 
         # Pass control off to the resource handler.
         result = super(Resource, cls).view(request, response)
 
+        if isinstance(result, collections.Iterator):
+            # Hand the stream to django; it is consumed as it is sent
+            # (rather than gathered into the content).
+            return response.stream_handle(result)
+
         # Configure the response and return it.
         response._handle.content = result
         return response._handle
@@ -57,6 +68,13 @@ OPERATOR_MAP = {
     constants.OPERATOR_GT: '__gt',
     constants.OPERATOR_LTE: '__lte',
     constants.OPERATOR_GTE: '__gte',
+    constants.OPERATOR_REGEX: '__regex',
+    constants.OPERATOR_SEARCH: '__search',
+    constants.OPERATOR_ICONTAINS: '__icontains',
+    constants.OPERATOR_IN: '__in',
+    constants.OPERATOR_BETWEEN: '__range',
+    constants.OPERATOR_STARTSWITH: '__startswith',
+    constants.OPERATOR_ISTARTSWITH: '__istartswith',
 }
 
 # import ipdb; ipdb.set_trace()
@@ -68,26 +86,73 @@ OPERATOR_MAP = dict(
 
 def segment_query(seg, attributes):
 
+    if not seg.values:
+        # A segment of only directives (eg. `foo:asc`) does not filter.
+        return noop_query()
+
     # Get the attribute in question.
     attribute = attributes[seg.path[0]]
 
-    # Replace the initial path segment with the expanded
-    # attribute path.
-    seg.path[0:1] = attribute.path.split('.')
+    # Expand the initial path segment to the attribute path. The segment
+    # is shared by the parse cache and must not be modified.
+    path = attribute.path.split('.') + list(seg.path[1:])
+
+    # Resolve the lookup that equality compares with (eg. `__exact`
+    # rather than `__iexact` on attributes that are not text).
+    op = OPERATOR_MAP[parser.resolve_operator(seg, attribute)]
+
+    # Build the lookup from the path.
+    path = '__'.join(path)
+
+    # Patterns and searches are matched as they were given (rather
+    # than cleaned).
+    if op in ('__regex', '__search'):
+        values = list(seg.values)
 
-    # Boolean's should use `exact` rather than `iexact`.
-    if attribute.type is bool:
-        op = '__exact'
     else:
-        op = OPERATOR_MAP[seg.operator]
+        values = list(map(attribute.try_clean, seg.values))
+
+    params = [x for x in values if x is not None]
+
+    # Several values compared for equality are tested as a set (other
+    # than strings compared case-insensitively).
+    as_set = op == '__in' or (
+        len(params) > 1 and op in ('__exact', '__iexact') and (
+            op == '__exact' or not any(
+                isinstance(x, six.string_types) for x in params)))
+
+    if op == '__search':
+        # Django only searches through a full-text index on MySQL; match
+        # every word of any of the values instead.
+        if not attribute.search:
+            raise exceptions.BadRequest({
+                '__all__': "Unable to search '%s'." % attribute.name})
+
+        q = reduce(operator.or_, [
+            reduce(operator.and_, [
+                Q((path + '__icontains', word))
+                for word in re.findall(r'\w+', value, re.UNICODE)], Q())
+            for value in values])
+
+    elif op == '__range':
+        # Test the (inclusive) range.
+        q = Q((path + op, values))
+
+    elif as_set:
+        # Test the values as a set (`IN (...)`); null values are tested
+        # apart from the set. Each value is bound as a parameter (sets are
+        # not loaded into a table as by `values_table_threshold` of the
+        # SQLAlchemy connector).
+        q = Q((path + '__in', params))
+        if len(params) < len(values):
+            q |= Q((path + '__isnull', True))
 
-    # Build the path from the segment.
-    path = '__'.join(seg.path) + op
+    else:
+        # Construct a Q-object from the segment.
+        q = reduce(operator.or_, map(lambda x: Q((path + op, x)), values))
 
-    # Construct a Q-object from the segment.
-    return reduce(operator.or_,
-                  map(lambda x: Q((path, x)),
-                      map(attribute.try_clean, seg.values)))
+    # Apply the negation (`NOT IN` for a set of values).
+    return ~q if seg.negated else q
 
 
 def noop_query(*args):
@@ -95,7 +160,8 @@ def noop_query(*args):
 
 
 def unary_query(query, *args):
-    return query.operation(build_clause(query.operand, *args))
+    # Q-objects are negated with `~` (rather than `not`).
+    return ~build_clause(query.operand, *args)
 
 
 def binary_query(query, *args):
@@ -160,11 +226,265 @@ class ModelResource(object):
 
     def filter(self, clause, queryset):
         # Filter the queryset by the passed clause.
-        return queryset.filter(clause).distinct()
+        return queryset.filter(clause)
+
+    def _joins_many(self, query):
+        # Determine if filtering by the query joins to many rows (and so
+        # repeats the items that match more than once).
+        for segment in parser.walk(query):
+            attribute = self.attributes.get(segment.path[0])
+            if not segment.values or attribute is None:
+                continue
+
+            path = attribute.path.split('.') + list(segment.path[1:])
+            if self._crosses_many(path):
+                return True
+
+        return False
+
+    def _crosses_many(self, path):
+        # Determine if the path crosses a relationship to many rows.
+        opts = self.meta.model._meta
+        for name in path[:-1]:
+            field, _, direct, m2m = opts.get_field_by_name(name)
+            if m2m or not direct:
+                return True
+
+            opts = field.rel.to._meta
+
+        return False
 
     def count(self, queryset):
-        # Return the count of the queryset.
-        return len(queryset)
+        # Count the queryset in the database rather than loading it.
+        return queryset.count()
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor not in ('postgresql', 'mysql'):
+            # No (cheap) estimate is available; count the queryset.
+            return self.count(queryset)
+
+        # Ask the query planner for the number of rows it expects.
+        sql, params = queryset.query.sql_with_params()
+        cursor = connection.cursor()
+
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, six.string_types):
+                plan = json.loads(plan)
+
+            return int(plan[0]['Plan']['Plan Rows'])
+
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [column[0] for column in cursor.description]
+        return int(cursor.fetchone()[columns.index('rows')])
+
+    def _sort_key(self, path, many=False):
+        attribute = self.attributes.get(path[0])
+        if attribute is None:
+            raise exceptions.BadRequest({
+                '__all__': "Unable to sort by '%s'." % '.'.join(path)})
+
+        # Expand the initial path segment to the attribute path; django
+        # joins any relationships along the path.
+        names = attribute.path.split('.') + list(path[1:])
+        if not many and self._crosses_many(names):
+            # An item would be ordered by each of its related rows.
+            raise exceptions.BadRequest({
+                '__all__': "Unable to sort by '%s'; it is related to "
+                           "many items." % '.'.join(path)})
+
+        return '__'.join(names)
+
+    def rank(self, searches, queryset):
+        if searches:
+            # Searches are matched by words (see `segment_query`) and have
+            # no relevance to order by.
+            raise exceptions.BadRequest({
+                '__all__': "Unable to rank searches '%s'." % ', '.join(
+                    '.'.join(segment.path) for segment in searches)})
+
+        return queryset
+
+    def sort(self, ordering, queryset):
+        keys = []
+        for path, descending in ordering:
+            key = self._sort_key(path)
+            keys.append('-' + key if descending else key)
+
+        if not keys:
+            # Nothing to sort by.
+            return queryset
+
+        # Order the queryset by the sort keys.
+        return queryset.order_by(*keys)
+
+    def _matched(self, queryset):
+        if queryset.query.distinct:
+            # The joins made to filter may repeat the items; aggregate
+            # the (distinct) items that matched instead.
+            queryset = self.meta.model.objects.filter(
+                pk__in=queryset.values('pk'))
+
+        return queryset.order_by()
+
+    def aggregate(self, aggregates, groups, queryset):
+        queryset = self._matched(queryset)
+
+        # Name each aggregate (the names of the attributes may collide
+        # with the fields of the model).
+        functions = {
+            'count': Count, 'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+        names = []
+        annotations = {}
+        for index, (function, name) in enumerate(aggregates):
+            key = self._sort_key((name,), True) if name is not None else 'pk'
+            names.append('armet_%d' % index)
+            annotations[names[-1]] = functions[function](key)
+
+        if not groups:
+            # Aggregate in a single row.
+            row = queryset.aggregate(**annotations)
+            return [[row[x] for x in names]]
+
+        # Aggregate each group in a single statement.
+        keys = [self._sort_key((name,), True) for name in groups]
+        queryset = queryset.values(*keys).annotate(**annotations)
+        return [[row[x] for x in keys + names]
+                for row in queryset.order_by(*keys)]
+
+    def facets(self, names, limit, queryset):
+        queryset = self._matched(queryset)
+
+        facets = {}
+        for name in names:
+            # Count the most frequent values in a single statement.
+            key = self._sort_key((name,), True)
+            rows = queryset.values(key).annotate(
+                armet_count=Count('pk')).order_by('-armet_count', key)
+            facets[name] = [
+                (row[key], row['armet_count']) for row in rows[:limit]]
+
+        return facets
+
+    def seek(self, queryset, keys, values):
+        keys = [(self._sort_key(path), desc) for path, desc in keys]
+
+        # Order by the keys (replacing the order of the sort directives).
+        queryset = queryset.order_by(*[
+            '-' + key if descending else key for key, descending in keys])
+
+        if values is not None:
+            # Seek past the values; (a, b) > (x, y) is expanded
+            # to a > x OR (a = x AND b > y) as the directions may differ.
+            clause = Q()
+            for index, (key, descending) in enumerate(keys):
+                lookups = dict(zip([x for x, _ in keys[:index]], values))
+                lookups[key + ('__lt' if descending else '__gt')] = (
+                    values[index])
+
+                clause |= Q(**lookups)
+
+            # Bound the leading key for the benefit of its index.
+            key, descending = keys[0]
+            bound = Q(**{key + ('__lte' if descending else '__gte'):
+                         values[0]})
+
+            queryset = queryset.filter(bound, clause)
+
+        return queryset
+
+    def read_related(self, target, resource, key):
+        return self.read_related_many([target], resource, key)[0]
+
+    def read_related_many(self, items, resource, key):
+        try:
+            # Read the related items of every item in a single query.
+            prefetch_related_objects(items, [key])
+
+        except (AttributeError, ValueError):
+            # Not a relationship that can be prefetched; each item is
+            # read in turn below.
+            pass
+
+        values = []
+        for item in items:
+            value = getattr(item, key)
+            if hasattr(value, 'all'):
+                # A related manager; the prefetched items are cached.
+                value = list(value.all())
+
+            values.append(value)
+
+        if not self.request.user:
+            return values
+
+        collections = [x for x in values if isinstance(x, list)]
+        if collections:
+            # Filter the related items (once) by asserting authorization.
+            pks = set(x.pk for value in collections for x in value)
+            queryset = resource.meta.model.objects.filter(pk__in=pks)
+            allowed = set(x.pk for x in resource.meta.authorization.filter(
+                self.request.user, 'read', resource, queryset))
+
+            for value in collections:
+                value[:] = [x for x in value if x.pk in allowed]
+
+        authz = self.meta.authorization
+        for value in values:
+            if value is not None and not isinstance(value, list):
+                # Ensure we can access this.
+                if not authz.is_authorized(
+                        self.request.user, 'read', resource, value):
+                    authz.unauthorized()
+
+        return values
+
+    def eager(self, queryset):
+        # Apply the loader plan of the resource.
+        joined = [p.replace('.', '__') for p, x in self.loaders if x == 'join']
+        if joined:
+            queryset = queryset.select_related(*joined)
+
+        selected = [
+            p.replace('.', '__') for p, x in self.loaders if x == 'select']
+        if selected:
+            queryset = queryset.prefetch_related(*selected)
+
+        return queryset
+
+    def batches(self, items, size):
+        if not isinstance(items, QuerySet):
+            return super(ModelResource, self).batches(items, size)
+
+        return self._batches(items, size)
+
+    def _batches(self, queryset, size):
+        # Read the rows without caching them in the queryset; related
+        # items that are prefetched are read for each batch instead
+        # (`iterator` does not prefetch).
+        selected = [
+            p.replace('.', '__') for p, x in self.loaders if x == 'select']
+
+        batches = super(ModelResource, self).batches(
+            queryset.iterator(), size)
+
+        for batch in batches:
+            if selected:
+                prefetch_related_objects(batch, selected)
+
+            yield batch
+
+    def project(self, paths, queryset):
+        # Load only the fields that are read (the primary key is always
+        # loaded); paths that are not fields (eg. properties) are skipped.
+        names = set(field.name for field in self.meta.model._meta.fields)
+        fields = [path for path in paths if path in names]
+        if len(fields) < len(names):
+            queryset = queryset.only(*fields)
+
+        return queryset
 
     def read(self):
         # Initialize the queryset to the model manager.
@@ -186,13 +506,28 @@ class ModelResource(object):
         elif self.request.query:
             # This is a list-access; use the query string and construct
             # a query object from it.
-            query = parser.parse(self.request.query)
+            try:
+                query = parser.parse(self.request.query)
+
+            except ValueError as ex:
+                raise exceptions.BadRequest({'__all__': six.text_type(ex)})
 
         # Determine if we need to filter the queryset in some way; and if so,
         # filter it.
         if query is not None:
             clause = build_clause(query, self.attributes)
             queryset = self.filter(clause, queryset)
+            if self._joins_many(query):
+                queryset = queryset.distinct()
+
+        # Load only the fields needed to respond (and load the related
+        # items that attributes traverse along with them).
+        paths = self.projected(query)
+        if paths is not None:
+            if self.projecting():
+                queryset = self.project(paths, queryset)
+
+            queryset = self.eager(queryset)
 
         # Filter the queryset by asserting authorization.
         queryset = self.meta.authorization.filter(
@@ -203,6 +538,12 @@ class ModelResource(object):
             result = queryset.all()[:1]
             return result[0] if result else None
 
+        if query is not None:
+            # Order the queryset by the relevance of ranked searches
+            # and then by the sort directives.
+            queryset = self.rank(parser.ranking(query), queryset)
+            queryset = self.sort(parser.sorting(query), queryset)
+
         # Return the entire queryset.
         return queryset.all()
 
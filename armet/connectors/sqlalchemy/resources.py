@@ -1,16 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
+import re
 import six
+import json
 import operator
+import collections
 from functools import partial
 from collections import Iterable
-from copy import deepcopy
 from six.moves import map, reduce
+from armet import utils
 from armet.exceptions import ImproperlyConfigured
 from armet.query import parser, Query, QuerySegment, constants
 from armet.http.exceptions import BadRequest
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.sql.expression import BindParameter, FunctionElement
+from sqlalchemy.ext.compiler import compiles
 import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 import functools
 
 
@@ -24,29 +30,120 @@ class ModelResourceOptions(object):
                 'A session factory (via sessionmaker) is required by '
                 'the SQLAlchemy model connector.')
 
+        #! Number of query shapes for which the built clause is retained
+        #! (in a cache private to the resource).
+        self.clause_cache_size = meta.get('clause_cache_size', 128)
+        self.clause_cache = utils.LRUCache(self.clause_cache_size)
+
+        #! Number of values of a set (eg. `id=1,2,3`) above which the
+        #! values are loaded into a temporary table (and compared with
+        #! `IN (SELECT ...)`) rather than bound one parameter each; which
+        #! would exceed the number of parameters allowed in a statement
+        #! by SQLite and SQL Server. `None` always binds the values; sets
+        #! are bound as a single array on PostgreSQL. Only the SQLAlchemy
+        #! connector loads sets into a table; the Django connector binds
+        #! each value of a set.
+        self.values_table_threshold = meta.get(
+            'values_table_threshold', 500)
+
 
 def ilike_helper(default):
     """Helper function that performs an `ilike` query if a string value
     is passed, otherwise the normal default operation."""
     @functools.wraps(default)
     def wrapped(x, y):
+        # Look through bound parameters to the value they were bound with.
+        value = y.value if isinstance(y, BindParameter) else y
+
         # String values should use ILIKE queries.
-        if isinstance(y, six.string_types) and not isinstance(x.type, sa.Enum):
+        if (isinstance(value, six.string_types)
+                and not isinstance(x.type, sa.Enum)):
             return x.ilike("%" + y + "%")
         else:
             return default(x, y)
     return wrapped
 
 
+class regexp(FunctionElement):
+    """Matches a value against a regular expression with the native
+    operator of the database (`value ~ pattern` on PostgreSQL and
+    `value REGEXP pattern` elsewhere).
+    """
+
+    type = sa.Boolean()
+
+    name = 'regexp'
+
+
+@compiles(regexp)
+def compile_regexp(element, compiler, **kwargs):
+    # SQLite resolves `REGEXP` through a user function (see
+    # `register_regexp`); MySQL matches case-insensitively unless the
+    # column has a binary collation.
+    value, pattern = element.clauses
+    return '(%s REGEXP %s)' % (
+        compiler.process(value, **kwargs),
+        compiler.process(pattern, **kwargs))
+
+
+@compiles(regexp, 'postgresql')
+def compile_regexp_postgresql(element, compiler, **kwargs):
+    value, pattern = element.clauses
+    return '(%s ~ %s)' % (
+        compiler.process(value, **kwargs),
+        compiler.process(pattern, **kwargs))
+
+
+def regex(x, y):
+    # Match the text of values that are not text (eg. `id*=^1`).
+    if not isinstance(x.type, sa.String):
+        x = sa.cast(x, sa.Unicode)
+
+    return regexp(x, y)
+
+
+def _regexp(pattern, value):
+    # Implements `value REGEXP pattern` for SQLite (which invokes the
+    # function as `regexp(pattern, value)`).
+    if value is None:
+        return None
+
+    return re.search(pattern, six.text_type(value)) is not None
+
+
+def register_regexp(resource):
+    # SQLite provides the `REGEXP` operator without an implementation;
+    # register one on the connection of the session.
+    if dialect(resource) == 'sqlite':
+        connection = resource.session.connection(
+            mapper=orm.class_mapper(resource.meta.model))
+        connection.connection.create_function('regexp', 2, _regexp)
+
+
+def iexact(x, y):
+    # Compare case-folded strings (`lower(x) = lower(y)`); which can be
+    # answered by an index on `lower(x)`.
+    value = y.value if isinstance(y, BindParameter) else y
+    if (isinstance(value, six.string_types)
+            and not isinstance(x.type, sa.Enum)):
+        return sa.func.lower(x) == sa.func.lower(y)
+
+    return x == y
+
+
 # Build an operator map to use for sqlalchemy.
 OPERATOR_MAP = {
     constants.OPERATOR_EQUAL: operator.eq,
-    constants.OPERATOR_IEQUAL: ilike_helper(operator.eq),
+    constants.OPERATOR_IEQUAL: iexact,
     constants.OPERATOR_LT: operator.lt,
     constants.OPERATOR_GT: operator.gt,
     constants.OPERATOR_LTE: operator.le,
     constants.OPERATOR_GTE: operator.ge,
-    constants.OPERATOR_ICONTAINS: ilike_helper(operator.contains),
+    constants.OPERATOR_REGEX: regex,
+    constants.OPERATOR_ICONTAINS: ilike_helper(operator.eq),
+    constants.OPERATOR_IN: operator.eq,
+    constants.OPERATOR_STARTSWITH: lambda x, y: x.like(y, escape='\\'),
+    constants.OPERATOR_ISTARTSWITH: lambda x, y: x.ilike(y, escape='\\'),
 }
 
 # Rewire the map.
@@ -55,70 +152,397 @@ OPERATOR_MAP = dict(
 )
 
 
-def build_segment(model, segment, attr, clean):
-    # Get the associated column for the initial path.
-    path = segment.path.pop(0)
-    col = getattr(model, path)
+#! Operators that compare for equality; several values are tested
+#! as a set.
+EQUALITY_OPERATORS = frozenset(constants.OPERATOR_MAP[x] for x in (
+    constants.OPERATOR_EQUAL, constants.OPERATOR_IEQUAL,
+    constants.OPERATOR_IN))
 
-    # Resolve the inner-most path segment.
-    if segment.path:
-        if col.impl.accepts_scalar_loader:
-            return col.has(build_segment(
-                col.property.mapper.class_, segment, attr, clean))
+#! Operators that match a prefix; the values are bound as patterns.
+PREFIX_OPERATORS = frozenset(constants.OPERATOR_MAP[x] for x in (
+    constants.OPERATOR_STARTSWITH, constants.OPERATOR_ISTARTSWITH))
 
-        else:
-            try:
-                return col.any(build_segment(
-                    col.property.mapper.class_, deepcopy(segment),
-                    attr, clean))
 
-            except InvalidRequestError:
-                return col.has(build_segment(
-                    col.property.mapper.class_, deepcopy(segment),
-                    attr, clean))
+class Array(list):
+    """Values that are bound as a single array parameter (and compared
+    with `= ANY(:values)`).
+    """
+
+    def __init__(self, values, null=False):
+        super(Array, self).__init__(values)
+
+        #! If null is tested along with the values (the array is then
+        #! followed by a `None` value).
+        self.null = null
+
+
+class ValuesTable(object):
+    """Values that are loaded into a temporary table (and compared with
+    `IN (SELECT value FROM table)`); see `load_values`.
+    """
+
+    def __init__(self, name, null=False):
+        #! Name of the temporary table.
+        self.name = name
+
+        #! If null is tested along with the values (see `Array`).
+        self.null = null
+
+
+def values_table_name(index):
+    return 'armet_values_%d' % index
+
+
+def load_values(resource, name, path, values):
+    """Load the values into a temporary table (of a column of the type
+    of the column at the end of the path).
+
+    The table is local to the connection of the session and is dropped
+    as the session is closed (see `ModelResource.route`).
+    """
+    model = resource.meta.model
+    column = join_path({}, model, path).property.columns[0]
+    connection = resource.session.connection(
+        mapper=orm.class_mapper(model))
+
+    table = resource._values_tables.get(name)
+    if table is None:
+        # SQL Server marks temporary tables by name (`#name`).
+        table = sa.Table(
+            name, sa.MetaData(), sa.Column('value', column.type),
+            prefixes=[] if name.startswith('#') else ['TEMPORARY'])
+
+        table.create(connection)
+        resource._values_tables[name] = table
+
+    else:
+        # The table was loaded before by the same request.
+        connection.execute(table.delete())
+
+    # Insert the values as many rows of a single parameter.
+    connection.execute(table.insert(), [{'value': x} for x in values])
+
+
+def dialect(resource):
+    # Resolve the name of the dialect of the database of the resource.
+    return resource.session.get_bind(resource.meta.model).dialect.name
+
+
+def supports_array(resource):
+    # Only PostgreSQL compares against the elements of an array parameter.
+    return dialect(resource) == 'postgresql'
+
+
+def _bound(value):
+    # Look through bound parameters to the value they were bound with.
+    return value.value if isinstance(value, BindParameter) else value
+
+
+def folded(col, op, values):
+    # Determine if case-insensitive equality case-folds the column and
+    # the values (`lower(x) = lower(y)`).
+    return (op is constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL]
+            and not isinstance(col.type, sa.Enum) and any(
+                isinstance(_bound(x), six.string_types) for x in values))
+
+
+def prefix_pattern(value):
+    # Escape the value and match anything that follows it (`foo%`); a
+    # pattern without a leading wildcard can be answered by an index.
+    for char in ('\\', '%', '_'):
+        value = value.replace(char, '\\' + char)
+
+    return value + '%'
+
+
+#! A relationship joined to filter by; `many` if the join can match
+#! more than one row for each item.
+Join = collections.namedtuple('Join', ['alias', 'relationship', 'many'])
+
+
+def join_path(joins, model, path):
+    """Resolve the column at the end of the passed path.
+
+    Each relationship along the path is joined once; the join (an alias
+    shared by every segment through the same path) is recorded in `joins`
+    by the path that leads to it.
+    """
+    target = model
+    for index, name in enumerate(path[:-1]):
+        key = tuple(path[:index + 1])
+        if key not in joins:
+            relationship = getattr(target, name)
+            joins[key] = Join(
+                orm.aliased(relationship.property.mapper.class_),
+                relationship, relationship.property.uselist)
 
-    # Determine the operator.
-    op = OPERATOR_MAP[segment.operator]
+        target = joins[key].alias
 
-    # Apply the operator to the values and return the expression
-    qs = reduce(operator.or_,
-                map(partial(op, col),
-                    map(lambda x: clean(attr.try_clean(x)), segment.values)))
+    return getattr(target, path[-1])
+
+
+def crosses_many(model, path):
+    # Determine if the path crosses a relationship to many rows.
+    target = model
+    for name in path[:-1]:
+        relationship = getattr(target, name)
+        if relationship.property.uselist:
+            return True
+
+        target = relationship.property.mapper.class_
+
+    return False
+
+
+def exists_path(model, path, build):
+    """Build the test of the column at the end of the passed path through
+    an `EXISTS` subquery for each relationship along it (`any` or `has`)
+    rather than through the joins shared by the query.
+    """
+    if len(path) == 1:
+        return build(getattr(model, path[0]))
+
+    relationship = getattr(model, path[0])
+    clause = exists_path(
+        relationship.property.mapper.class_, path[1:], build)
+
+    if relationship.property.uselist:
+        return relationship.any(clause)
+
+    return relationship.has(clause)
+
+
+def resolve_path(joins, model, path, negated, inverted, build):
+    # Under negation, a test through a relationship to many rows is made
+    # (and negated) as a whole; no related row may match (as with
+    # `exclude` in django) rather than some related row failing the test.
+    if (negated or inverted) and crosses_many(model, path):
+        return exists_path(model, path, build)
+
+    return build(join_path(joins, model, path))
+
+
+class search(FunctionElement):
+    """Matches a column against the words of a full-text search through
+    its index: the FTS5 table `index` on SQLite (whose rows are those of
+    the table by `rowid`), a text search in `config` on PostgreSQL and
+    a `FULLTEXT` index on MySQL.
+    """
+
+    type = sa.Boolean()
+
+    name = 'search'
+
+    def __init__(self, column, rowid, text, index, config):
+        self.index = index
+        self.config = config
+        super(search, self).__init__(column, rowid, text)
+
+
+class search_rank(search):
+    """The relevance of a column to a full-text search (see `search`);
+    higher is more relevant.
+    """
+
+    type = sa.Float()
+
+    name = 'search_rank'
+
+
+def _search_fts5(element, compiler, **kwargs):
+    # Resolve the FTS5 table, its column and the arguments of a search.
+    column, rowid, text = element.clauses
+    index = compiler.preparer.quote_identifier(element.index)
+    return dict(
+        index=index,
+        column='%s.%s' % (index, compiler.preparer.quote_identifier(
+            column.name)),
+        rowid=compiler.process(rowid, **kwargs),
+        text=compiler.process(text, **kwargs))
+
+
+def _search_tsvector(element, compiler, **kwargs):
+    # Resolve the document and query of a search (in its configuration).
+    column, _, text = element.clauses
+    config = "'%s'" % element.config.replace("'", "''")
+    return (
+        'to_tsvector(%s, %s)' % (config, compiler.process(column, **kwargs)),
+        'plainto_tsquery(%s, %s)' % (config, compiler.process(text, **kwargs)))
+
+
+def _search_fulltext(element, compiler, **kwargs):
+    column, _, text = element.clauses
+    return '(MATCH (%s) AGAINST (%s IN NATURAL LANGUAGE MODE))' % (
+        compiler.process(column, **kwargs), compiler.process(text, **kwargs))
+
+
+@compiles(search)
+def compile_search(element, compiler, **kwargs):
+    return '(%(rowid)s IN (SELECT rowid FROM %(index)s WHERE %(column)s ' \
+        'MATCH %(text)s))' % _search_fts5(element, compiler, **kwargs)
+
+
+@compiles(search_rank)
+def compile_search_rank(element, compiler, **kwargs):
+    # The rank of FTS5 is lower for more relevant rows.
+    return '(SELECT -rank FROM %(index)s WHERE %(column)s MATCH %(text)s ' \
+        'AND rowid = %(rowid)s)' % _search_fts5(element, compiler, **kwargs)
+
+
+@compiles(search, 'postgresql')
+def compile_search_postgresql(element, compiler, **kwargs):
+    return '(%s @@ %s)' % _search_tsvector(element, compiler, **kwargs)
+
+
+@compiles(search_rank, 'postgresql')
+def compile_search_rank_postgresql(element, compiler, **kwargs):
+    return 'ts_rank(%s, %s)' % _search_tsvector(element, compiler, **kwargs)
+
+
+@compiles(search, 'mysql')
+@compiles(search_rank, 'mysql')
+def compile_search_mysql(element, compiler, **kwargs):
+    return _search_fulltext(element, compiler, **kwargs)
+
+
+def search_text(value):
+    # Match each word of the value (as a quoted phrase) with FTS5; as does
+    # `plainto_tsquery` on PostgreSQL.
+    return ' '.join('"%s"' % word for word in re.findall(
+        r'\w+', value, re.UNICODE)) or '""'
+
+
+def searched(col, attribute):
+    # Resolve the key of the row of the searched column and the FTS5
+    # table that indexes it.
+    mapper = col.property.parent
+    key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    index = attribute.search
+    if not isinstance(index, six.string_types):
+        index = '%s_fts' % mapper.local_table.name
+
+    return getattr(col.class_, key), index
+
+
+def search_column(resource, attribute, values, col):
+    # Search for any of the values through the index of the column.
+    rowid, index = searched(col, attribute)
+    return reduce(operator.or_, [
+        search(col, rowid, value, index, resource.meta.search_config)
+        for value in values])
+
+
+def search_segment(resource, joins, attribute, path, negated, inverted,
+                   values):
+    qs = resolve_path(
+        joins, resource.meta.model, path, negated, inverted,
+        partial(search_column, resource, attribute, values))
+
+    # Apply the negation.
+    return ~qs if negated else qs
+
+
+def build_segment(joins, model, path, op, negated, inverted, values):
+    # Get the associated column; joining to it as needed.
+    qs = resolve_path(
+        joins, model, path, negated, inverted,
+        partial(compare, op, values))
 
     # Apply the negation.
-    if segment.negated:
+    if negated:
         qs = ~qs
 
     # Return our query object.
     return qs
 
 
-def segment_query(resource, segment, attributes, cleaners, model):
+def compare(op, values, col):
+    # Null values are tested (`IS NULL`) apart from a set of values.
+    params = [x for x in values if x is not None]
 
-    attribute = attributes[segment.path[0]]
+    if op is constants.OPERATOR_MAP[constants.OPERATOR_BETWEEN]:
+        # Test the (inclusive) range.
+        qs = col.between(*values)
+        params = values
 
-    # Modify the segment's to reflect what the attribute was declared for.
-    segment.path[0:1] = attribute.path.split('.')
+    elif params and isinstance(_bound(params[0]), ValuesTable):
+        # Compare with the rows of the temporary table of the values.
+        table = sa.sql.table(_bound(params[0]).name, sa.sql.column('value'))
+        qs = col.in_(sa.select([table.c.value]))
 
-    # Create a cleaner that can work here.
-    clean = partial(cleaners[attribute.name], resource)
+    elif params and isinstance(_bound(params[0]), Array):
+        # Compare with the elements of the array (`= ANY(:values)`).
+        param = sa.bindparam(params[0].key, params[0].value,
+                             type_=postgresql.ARRAY(col.type))
+        qs = col == sa.func.any(param)
 
-    # Dispatch to the recursive segment building function
-    return build_segment(model, segment, attribute, clean)
+    elif len(params) > 1 and op in EQUALITY_OPERATORS:
+        # Test the values as a set (`IN (...)`).
+        if folded(col, op, params):
+            qs = sa.func.lower(col).in_([sa.func.lower(x) for x in params])
+
+        else:
+            qs = col.in_(params)
+
+    else:
+        # Apply the operator to the values in turn.
+        qs = reduce(operator.or_, map(partial(OPERATOR_MAP[op], col), values))
+        params = values
+
+    if len(params) < len(values):
+        qs = sa.or_(qs, col.is_(None))
+
+    return qs
+
+
+def segment_query(segment, resource, values, joins, inverted):
+
+    if not segment.values:
+        # A segment of only directives (eg. `foo:asc`) does not filter.
+        return noop_query()
+
+    attribute = resource.attributes[segment.path[0]]
+
+    # Expand the initial path segment to reflect what the attribute was
+    # declared for. The segment is shared by the parse cache and must
+    # not be modified.
+    path = attribute.path.split('.') + list(segment.path[1:])
+
+    # Take the bound parameters of this segment; a set bound as one
+    # value is followed by `None` only where null is also tested.
+    first = next(values)
+    if isinstance(_bound(first), (Array, ValuesTable)):
+        values = [first] + ([next(values)] if _bound(first).null else [])
+
+    else:
+        values = [first] + [next(values) for _ in segment.values[1:]]
+
+    # Build the expression against the (joined) column.
+    op = parser.resolve_operator(segment, attribute)
+    model = resource.meta.model
+    if op is constants.OPERATOR_MAP[constants.OPERATOR_SEARCH]:
+        return search_segment(
+            resource, joins, attribute, path, segment.negated, inverted,
+            values)
+
+    return build_segment(
+        joins, model, path, op, segment.negated, inverted, values)
 
 
 def noop_query(*args):
     return sa.sql.true()
 
 
-def unary_query(resource, query, *args):
-    return query.operation(build_clause(resource, query.operand, *args))
+def unary_query(query, resource, values, joins, inverted):
+    # Clauses are negated with `~` (rather than `not`); the operand is
+    # built as under negation.
+    return ~build_clause(query.operand, resource, values, joins, True)
 
 
-def binary_query(resource, query, *args):
+def binary_query(query, *args):
     return query.operation(
-        build_clause(resource, query.left, *args),
-        build_clause(resource, query.right, *args))
+        build_clause(query.left, *args),
+        build_clause(query.right, *args))
 
 
 CLAUSE_MAP = {
@@ -129,22 +553,183 @@ CLAUSE_MAP = {
 }
 
 
-def build_clause(resource, query, attributes, cleaners, model):
+def build_clause(query, resource, values, joins, inverted=False):
+    """Build the clause for the passed query.
+
+    The clause refers to each (non-null) value through a bound parameter
+    (named by `param_name`); `values` iterates over the cleaned values in
+    the order collected by `clause_key`. The relationships the clause
+    refers to are collected into `joins` (see `join_path`); `inverted` if
+    the query is negated (where relationships to many rows are tested
+    through `EXISTS` subqueries instead).
+    """
     class_ = type(query) if not isinstance(query, type) else query
     fn = CLAUSE_MAP.get(class_)
     if fn is not None:
-        return fn(resource, query, attributes, cleaners, model)
+        return fn(query, resource, values, joins, inverted)
     elif issubclass(class_, Query):
         return build_clause(
-            resource,
-            query.parsed,
-            attributes,
-            cleaners,
-            model)
+            query.parsed, resource, values, joins, inverted)
+    else:
+        raise ValueError('Unable to translate query node %s' % str(query))
+
+
+def param_name(index):
+    return 'armet_%d' % index
+
+
+def as_set(op, params):
+    # Determine if the values are compared for equality as a set (other
+    # than strings compared case-insensitively).
+    return len(params) > 1 and op in EQUALITY_OPERATORS and (
+        op is not constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL]
+        or not any(isinstance(x, six.string_types) for x in params))
+
+
+def segment_key(resource, segment, attributes, cleaners, values):
+
+    if not segment.values:
+        # A segment of only directives (eg. `foo:asc`) does not filter.
+        return None
+
+    # Clean each value for the attribute.
+    attribute = attributes[segment.path[0]]
+    clean = partial(cleaners[attribute.name], resource)
+    cleaned = [clean(attribute.try_clean(x)) for x in segment.values]
+
+    # Resolve the operator that equality compares with.
+    op = parser.resolve_operator(segment, attribute)
+
+    if op in PREFIX_OPERATORS:
+        # Bind the patterns that match the prefixes.
+        cleaned = [prefix_pattern(six.text_type(x)) if x is not None else x
+                   for x in cleaned]
+
+    elif op is constants.OPERATOR_MAP[constants.OPERATOR_REGEX]:
+        # Bind the patterns (validated by the parser) as they were given;
+        # they are not values of the attribute.
+        cleaned = list(segment.values)
+        register_regexp(resource)
+
+    elif op is constants.OPERATOR_MAP[constants.OPERATOR_SEARCH]:
+        # Bind the text of each search (as an FTS5 query on SQLite).
+        if not attribute.search:
+            raise BadRequest({
+                '__all__': "Unable to search '%s'." % attribute.name})
+
+        cleaned = list(segment.values)
+        if dialect(resource) == 'sqlite':
+            cleaned = list(map(search_text, cleaned))
+
+    params = [x for x in cleaned if x is not None]
+    if as_set(op, params) and supports_array(resource):
+        # Bind the values as one array; the clause does not depend on
+        # the number of values.
+        null = len(params) < len(cleaned)
+        values.append(Array(params, null))
+        if null:
+            values.append(None)
+
+        return (segment.path, op, segment.negated, Array,
+                len(params) < len(cleaned))
+
+    threshold = resource.meta.values_table_threshold
+    if (threshold is not None and len(params) > threshold
+            and as_set(op, params)):
+        # Load the values into a temporary table; the clause does not
+        # depend on the number of values.
+        name = values_table_name(len(values))
+        if dialect(resource) == 'mssql':
+            name = '#' + name
+
+        path = attribute.path.split('.') + list(segment.path[1:])
+        load_values(resource, name, path, params)
+        null = len(params) < len(cleaned)
+        values.append(ValuesTable(name, null))
+        if null:
+            values.append(None)
+
+        return (segment.path, op, segment.negated, ValuesTable,
+                len(params) < len(cleaned))
+
+    values.extend(cleaned)
+
+    # The type of each value decides how it is compared (eg. strings
+    # use ILIKE and `None` tests for NULL).
+    return (segment.path, op, segment.negated, tuple(map(type, cleaned)))
+
+
+def unary_key(resource, query, *args):
+    return (query.operation, clause_key(resource, query.operand, *args))
+
+
+def binary_key(resource, query, *args):
+    return (query.operation,
+            clause_key(resource, query.left, *args),
+            clause_key(resource, query.right, *args))
+
+
+KEY_MAP = {
+    parser.NoopQuerySegment: lambda *args: None,
+    parser.BinarySegmentCombinator: binary_key,
+    parser.UnarySegmentCombinator: unary_key,
+    parser.QuerySegment: segment_key,
+}
+
+
+def clause_key(resource, query, attributes, cleaners, values):
+    """Normalize the passed query into the shape of its clause.
+
+    Queries that differ only in their values (eg. `age>=30` and `age>=40`)
+    have the same shape and share a clause. The cleaned values are
+    appended to `values` in the order they are bound in the clause.
+    """
+    class_ = type(query)
+    fn = KEY_MAP.get(class_)
+    if fn is not None:
+        return fn(resource, query, attributes, cleaners, values)
+    elif issubclass(class_, Query):
+        return clause_key(resource, query.parsed, attributes, cleaners,
+                          values)
     else:
         raise ValueError('Unable to translate query node %s' % str(query))
 
 
+def compile_clause(resource, query):
+    """Resolve the clause for the passed query along with the values
+    of its bound parameters and the joins it refers to.
+    """
+
+    # Normalize the query and collect its values.
+    values = []
+    key = clause_key(
+        resource, query, resource.attributes, resource.cleaners, values)
+
+    # Values are bound by position; null values are rendered in the
+    # clause itself (as `IS NULL`) and tables of values are selected from.
+    params = dict((param_name(index), value)
+                  for index, value in enumerate(values)
+                  if value is not None
+                  and not isinstance(value, ValuesTable))
+
+    cache = resource.meta.clause_cache
+    compiled = cache.get(key)
+    if compiled is None:
+        # Build a clause for this shape of query.
+        slots = iter([
+            sa.bindparam(param_name(index), value)
+            if value is not None else None
+            for index, value in enumerate(values)])
+
+        joins = collections.OrderedDict()
+        clause = build_clause(query, resource, slots, joins)
+
+        compiled = cache[key] = clause, joins
+
+    clause, joins = compiled
+    return clause, params, joins
+
+
 class ModelResource(object):
     """Specializes the RESTFul model resource protocol for SQLAlchemy.
 
@@ -156,11 +741,26 @@ class ModelResource(object):
     def route(self, *args, **kwargs):
         # Establish a session.
         self.session = session = self.meta.Session()
+        streamed = False
+
+        #! Aliases of the relationships joined by the request (by path);
+        #! the joins are shared between filtering, sorting and seeking.
+        self._joins = {}
+
+        #! Temporary tables of values loaded by the request (by name);
+        #! see `load_values`.
+        self._values_tables = {}
 
         try:
             # Continue on with the cycle.
             result = super(ModelResource, self).route(*args, **kwargs)
 
+            if isinstance(result, collections.Iterator):
+                # The items are read as the response is streamed; the
+                # session is kept until the stream ends.
+                streamed = True
+                return self._stream(result)
+
             # Commit the session.
             session.commit()
 
@@ -174,18 +774,323 @@ class ModelResource(object):
             # Re-raise the exception.
             raise
 
+        finally:
+            if not streamed:
+                # Close the session.
+                self._close()
+
+    def _stream(self, chunks):
+        session = self.session
+        try:
+            for chunk in chunks:
+                yield chunk
+
+            # Commit the session.
+            session.commit()
+
+        except:
+            # Something occurred (or the client went away); rollback
+            # the session.
+            session.rollback()
+
+            # Re-raise the exception.
+            raise
+
         finally:
             # Close the session.
-            session.close()
+            self._close()
+
+    def _close(self):
+        try:
+            if self._values_tables:
+                # Drop the temporary tables of values; the connection
+                # outlives the session in the pool.
+                connection = self.session.connection(
+                    mapper=orm.class_mapper(self.meta.model))
+                quote = connection.dialect.identifier_preparer.quote_identifier
+                for name in self._values_tables:
+                    connection.execute('DROP TABLE IF EXISTS %s' % quote(name))
+
+                self.session.commit()
+
+        finally:
+            self.session.close()
 
     def filter(self, clause, queryset):
         # Filter the queryset by the passed clause.
-        return queryset.filter(clause).distinct()
+        return queryset.filter(clause)
+
+    def join(self, joins, queryset):
+        # Join each relationship (once per request).
+        for key, join in six.iteritems(joins):
+            if key not in self._joins:
+                queryset = queryset.outerjoin(join.alias, join.relationship)
+                self._joins[key] = join.alias
+
+        if any(join.many for join in six.itervalues(joins)):
+            # A join to many rows repeats the items that match more
+            # than once.
+            queryset = queryset.distinct()
+
+        return queryset
 
     def count(self, queryset):
         # Return the count of the queryset.
         return queryset.count()
 
+    def estimate(self, queryset):
+        bind = self.session.get_bind(self.meta.model)
+        if bind.dialect.name not in ('postgresql', 'mysql'):
+            # No (cheap) estimate is available; count the queryset.
+            return self.count(queryset)
+
+        # Ask the query planner for the number of rows it expects.
+        compiled = queryset.statement.compile(dialect=bind.dialect)
+        params = compiled.params
+        if compiled.positional:
+            params = [params[name] for name in compiled.positiontup]
+
+        connection = self.session.connection()
+
+        if bind.dialect.name == 'postgresql':
+            text = 'EXPLAIN (FORMAT JSON) %s' % compiled
+            plan = connection.execute(text, params).scalar()
+            if isinstance(plan, six.string_types):
+                plan = json.loads(plan)
+
+            return int(plan[0]['Plan']['Plan Rows'])
+
+        text = 'EXPLAIN %s' % compiled
+        return int(connection.execute(text, params).first()['rows'])
+
+    def _sort_column(self, path, queryset, many=False):
+        attribute = self.attributes.get(path[0])
+        if attribute is None:
+            raise BadRequest({
+                '__all__': "Unable to sort by '%s'." % '.'.join(path)})
+
+        # Expand the initial path segment to the attribute path.
+        names = attribute.path.split('.') + list(path[1:])
+        if not many and crosses_many(self.meta.model, names):
+            # An item would be ordered by each of its related rows.
+            raise BadRequest({
+                '__all__': "Unable to sort by '%s'; it is related to "
+                           "many items." % '.'.join(path)})
+
+        # Join each relationship along the path (once per request).
+        joins = self._joins
+        target = self.meta.model
+        for index, name in enumerate(names[:-1]):
+            key = tuple(names[:index + 1])
+            if key not in joins:
+                relationship = getattr(target, name)
+                joins[key] = orm.aliased(relationship.property.mapper.class_)
+                queryset = queryset.outerjoin(joins[key], relationship)
+
+            target = joins[key]
+
+        return queryset, getattr(target, names[-1])
+
+    def sort(self, ordering, queryset):
+        for path, descending in ordering:
+            # Order by the column.
+            queryset, column = self._sort_column(path, queryset)
+            queryset = queryset.order_by(
+                column.desc() if descending else column.asc())
+
+        return queryset
+
+    def rank(self, searches, queryset):
+        for segment in searches:
+            # Order by the relevance of the column to any of the values.
+            queryset, column = self._sort_column(segment.path, queryset)
+            rowid, index = searched(
+                column, self.attributes[segment.path[0]])
+
+            values = segment.values
+            if dialect(self) == 'sqlite':
+                values = map(search_text, values)
+
+            relevance = [search_rank(
+                column, rowid, sa.literal(value), index,
+                self.meta.search_config) for value in values]
+
+            queryset = queryset.order_by(*[x.desc() for x in relevance])
+
+        return queryset
+
+    def _matched(self, queryset):
+        key = sa.inspect(self.meta.model).primary_key[0]
+        if self._joins:
+            # The joins made to filter may repeat the items; aggregate
+            # the (distinct) items that matched instead.
+            matched = queryset.with_entities(key).order_by(None)
+            queryset = self.session.query(self.meta.model).filter(
+                key.in_(matched.subquery()))
+            self._joins = {}
+
+        return queryset.order_by(None), key
+
+    def aggregate(self, aggregates, groups, queryset):
+        queryset, key = self._matched(queryset)
+
+        # Resolve the columns of the groups and of the aggregates.
+        columns = []
+        for name in groups:
+            queryset, column = self._sort_column((name,), queryset, True)
+            columns.append(column)
+
+        expressions = []
+        for function, name in aggregates:
+            if name is None:
+                # Count the items (by their key; the model must be
+                # selected from).
+                expressions.append(sa.func.count(key))
+                continue
+
+            queryset, column = self._sort_column((name,), queryset, True)
+            expressions.append(getattr(sa.func, function)(column))
+
+        # Aggregate in a single statement.
+        queryset = queryset.with_entities(*(columns + expressions))
+        if columns:
+            queryset = queryset.group_by(*columns).order_by(*columns)
+
+        return [list(row) for row in queryset]
+
+    def facets(self, names, limit, queryset):
+        queryset, key = self._matched(queryset)
+
+        # Resolve the columns (joining each path once).
+        columns = []
+        for name in names:
+            queryset, column = self._sort_column((name,), queryset, True)
+            columns.append(column)
+
+        facets = {}
+        for name, column in zip(names, columns):
+            # Count the most frequent values in a single statement.
+            count = sa.func.count(key)
+            facets[name] = [tuple(row) for row in queryset.with_entities(
+                column, count).group_by(column).order_by(
+                count.desc(), column).limit(limit)]
+
+        return facets
+
+    def seek(self, queryset, keys, values):
+        columns = []
+        for path, descending in keys:
+            queryset, column = self._sort_column(path, queryset)
+            columns.append((column, descending))
+
+        # Order by the keys (replacing the order of the sort directives).
+        queryset = queryset.order_by(None).order_by(*[
+            column.desc() if descending else column.asc()
+            for column, descending in columns])
+
+        if values is not None:
+            # Bind the values with the types of their columns (eg. booleans
+            # are not comparable as plain values).
+            values = [sa.literal(value, type_=column.type)
+                      for (column, _), value in zip(columns, values)]
+
+            # Seek past the values; (a, b) > (x, y) is expanded
+            # to a > x OR (a = x AND b > y) as the directions may differ.
+            clauses = []
+            for index, (column, descending) in enumerate(columns):
+                op = operator.lt if descending else operator.gt
+                clauses.append(sa.and_(*[
+                    prior == value for (prior, _), value
+                    in zip(columns[:index], values)] + [
+                    op(column, values[index])]))
+
+            # Bound the leading key for the benefit of its index.
+            column, descending = columns[0]
+            op = operator.le if descending else operator.ge
+            queryset = queryset.filter(
+                op(column, values[0]), sa.or_(*clauses))
+
+        return queryset
+
+    def _contains_eager(self, path):
+        # Build the options to load a path from the joins made to filter
+        # by it; only for joins to one row (a filtered join to many rows
+        # would only load the rows that matched).
+        joined = self._joins
+        mapper = sa.inspect(self.meta.model)
+        options = []
+        names = path.split('.')
+        for index, name in enumerate(names):
+            key = tuple(names[:index + 1])
+            prop = mapper.relationships.get(name)
+            if key not in joined or prop is None or prop.uselist:
+                return None
+
+            options.append(orm.contains_eager(
+                '.'.join(key), alias=joined[key]))
+            mapper = prop.mapper
+
+        return options
+
+    def eager(self, queryset):
+        # Apply the loader plan of the resource.
+        options = []
+        for path, strategy in self.loaders:
+            if strategy == 'join':
+                joined = self._contains_eager(path)
+                if joined:
+                    # Reuse the join made to filter.
+                    options.extend(joined)
+
+                else:
+                    options.append(orm.joinedload_all(path))
+
+            else:
+                options.append(orm.subqueryload_all(path))
+
+        return queryset.options(*options) if options else queryset
+
+    def batches(self, items, size):
+        if isinstance(items, orm.Query) and self._batchable():
+            # Fetch the rows from a server-side cursor a batch at a time.
+            items = items.yield_per(size).execution_options(
+                stream_results=True)
+
+        return super(ModelResource, self).batches(items, size)
+
+    def _batchable(self):
+        # Rows are only loaded a batch at a time if every eagerly loaded
+        # relationship is joined to one row (a collection or a
+        # subquery load would be cut at the end of the batch).
+        for path, strategy in self.loaders:
+            if strategy != 'join':
+                return False
+
+            mapper = sa.inspect(self.meta.model)
+            for name in path.split('.'):
+                prop = mapper.relationships.get(name)
+                if prop is None or prop.uselist:
+                    return False
+
+                mapper = prop.mapper
+
+        return True
+
+    def project(self, paths, queryset):
+        # Defer the loading of the columns that are not read; keys are
+        # always loaded (relationships and identity depend on them).
+        options = []
+        for prop in sa.inspect(self.meta.model).column_attrs:
+            if prop.key in paths:
+                continue
+
+            if any(c.primary_key or c.foreign_keys for c in prop.columns):
+                continue
+
+            options.append(orm.defer(prop.key))
+
+        return queryset.options(*options) if options else queryset
+
     def read(self):
         # Initialize the query to the model.
         queryset = self.session.query(self.meta.model)
@@ -206,23 +1111,40 @@ class ModelResource(object):
         elif self.request.query:
             # This is a list-access; use the query string and construct
             # a query object from it.
-            query = parser.parse(self.request.query)
+            try:
+                query = parser.parse(self.request.query)
+
+            except ValueError as ex:
+                raise BadRequest({'__all__': six.text_type(ex)})
 
         # Determine if we need to filter the queryset in some way; and if so,
         # filter it.
         clause = None
         if query is not None:
-            clause = build_clause(
-                self, query, self.attributes,
-                self.cleaners, self.meta.model)
+            clause, params, joins = compile_clause(self, query)
+            queryset = self.join(joins, queryset)
+            queryset = self.filter(clause, queryset).params(**params)
 
-            queryset = self.filter(clause, queryset)
+        # Load only the columns needed to respond (and load the related
+        # items that attributes traverse along with them).
+        paths = self.projected(query)
+        if paths is not None:
+            if self.projecting():
+                queryset = self.project(paths, queryset)
+
+            queryset = self.eager(queryset)
 
         if self.slug is None:
             # Filter the queryset by asserting authorization.
             queryset = self.meta.authorization.filter(
                 self.request.user, 'read', self, queryset)
 
+            if query is not None:
+                # Order the queryset by the relevance of ranked searches
+                # and then by the sort directives.
+                queryset = self.rank(parser.ranking(query), queryset)
+                queryset = self.sort(parser.sorting(query), queryset)
+
             # Return the queryset.
             return queryset
 
@@ -417,6 +1339,54 @@ class ModelResource(object):
         # Return the queryset.
         return qs
 
+    def read_related_many(self, items, resource, key):
+        mapper = sa.inspect(self.meta.model)
+        if (not items or key not in mapper.relationships
+                or len(mapper.primary_key) != 1):
+            # Not a relationship we can query in one go.
+            return super(ModelResource, self).read_related_many(
+                items, resource, key)
+
+        # Read the related items of every item in a single query by
+        # joining from the items (identified by their primary key).
+        prop = mapper.relationships[key]
+        parent = orm.aliased(self.meta.model)
+        column = getattr(parent, mapper.get_property_by_column(
+            mapper.primary_key[0]).key)
+
+        pks = [mapper.primary_key_from_instance(x)[0] for x in items]
+        query = self.session.query(prop.mapper.class_, column)
+        query = query.select_from(parent).join(getattr(parent, key))
+        query = query.filter(column.in_(set(pks)))
+        if prop.order_by:
+            query = query.order_by(*prop.order_by)
+
+        if prop.uselist and self.request.user:
+            # Filter the related items (once) by asserting authorization.
+            query = resource.meta.authorization.filter(
+                self.request.user, 'read', resource, query)
+
+        related = dict((pk, []) for pk in pks)
+        for target, pk in query:
+            related[pk].append(target)
+
+        if prop.uselist:
+            return [related[pk] for pk in pks]
+
+        values = []
+        for pk in pks:
+            target = related[pk][0] if related[pk] else None
+            if target is not None and self.request.user:
+                # Ensure we can access this.
+                authz = self.meta.authorization
+                if not authz.is_authorized(
+                        self.request.user, 'read', resource, target):
+                    authz.unauthorized()
+
+            values.append(target)
+
+        return values
+
     def clean_related(self, relation, value):
         # Grab the model in question.
         model = relation.resource.meta.model
@@ -5,7 +5,6 @@ import abc
 import six
 import mimeparse
 import weakref
-import io
 from armet import exceptions
 from . import request, client
 
@@ -156,8 +155,13 @@ class Response(object):
         #! via the standard rules.
         self._encoding = None
 
-        #! The underlying file stream to write incoming data to.
-        self._stream = io.BytesIO()
+        #! The `Content-Type` header the encoding was last resolved from
+        #! along with the resolved encoding.
+        self._content_type = None
+        self._charset = None
+
+        #! The chunks (of bytes) written since the last flush.
+        self._chunks = []
 
         #! The content chunk to return to the client.
         self._body = None
@@ -221,16 +225,22 @@ class Response(object):
 
         # Get the `Content-Type` header, if available.
         content_type = self.headers.get('Content-Type')
-        if content_type:
-            # Parse out the primary type and parameters from the media type.
+        if not content_type:
+            # No encoding found.
+            return None
+
+        if content_type != self._content_type:
+            # Parse out the primary type and parameters from the media type
+            # (once for each value the header is set to).
             ptype, _, params = mimeparse.parse_mime_type(content_type)
 
-            # Return the specified charset or the default depending on the
+            # Resolve the specified charset or the default depending on the
             # primary type.
             default = 'utf-8' if ptype == 'application' else 'iso-8859-1'
-            return params.get('charset', default)
+            self._charset = params.get('charset', default)
+            self._content_type = content_type
 
-        # No encoding found.
+        return self._charset
 
     @encoding.setter
     def encoding(self, value):
@@ -277,9 +287,10 @@ class Response(object):
         """Writes the given chunk to the output buffer.
 
         @param[in] chunk
-            Either a byte array, a unicode string, or a generator. If `chunk`
-            is a generator then calling `self.write(<generator>)` is
-            equivalent to:
+            Either a byte string (or any object exposing its bytes, such as
+            a `bytearray` or a `memoryview`), a unicode string, or a
+            generator. If `chunk` is a generator then calling
+            `self.write(<generator>)` is equivalent to:
 
             @code
                 for x in <generator>:
@@ -314,24 +325,21 @@ class Response(object):
             self._length += len(chunk)
 
             # If passed a byte string, we hope the user encoded it properly.
-            self._stream.write(chunk)
+            self._chunks.append(chunk)
 
-        elif isinstance(chunk, six.string_types):
-            encoding = self.encoding
-            if encoding is not None:
-                # If passed a string, we can encode it for the user.
-                chunk = chunk.encode(encoding)
+        elif isinstance(chunk, (bytearray, memoryview)):
+            # Copy out the bytes (the object may be changed once written).
+            self.write(memoryview(chunk).tobytes())
 
-            else:
-                # Bail; we don't have an encoding.
-                raise exceptions.InvalidOperation(
-                    'Attempting to write textual data without an encoding.')
+        elif isinstance(chunk, six.string_types):
+            # If passed a string, we can encode it for the user.
+            chunk = self._encode(chunk)
 
             # Update the stream length.
             self._length += len(chunk)
 
-            # Write the encoded data into the byte stream.
-            self._stream.write(chunk)
+            # Write the encoded data into the buffer.
+            self._chunks.append(chunk)
 
         elif isinstance(chunk, collections.Iterable):
             # If passed some kind of iterator, attempt to recurse into
@@ -344,6 +352,15 @@ class Response(object):
             raise exceptions.InvalidOperation(
                 'Attempting to write something not recognized.')
 
+    def _encode(self, text):
+        encoding = self.encoding
+        if encoding is None:
+            # Bail; we don't have an encoding.
+            raise exceptions.InvalidOperation(
+                'Attempting to write textual data without an encoding.')
+
+        return text.encode(encoding)
+
     def serialize(self, data, format=None):
         """Serializes the data into this response using a serializer.
 
@@ -374,9 +391,7 @@ class Response(object):
         self.require_not_closed()
 
         # Pull out the accumulated chunk.
-        chunk = self._stream.getvalue()
-        self._stream.truncate(0)
-        self._stream.seek(0)
+        chunk = self._pull()
 
         # Append the chunk to the body.
         self.body = chunk if (self._body is None) else (self._body + chunk)
@@ -385,6 +400,45 @@ class Response(object):
             # We are now streaming because we're asynchronous.
             self.streaming = True
 
+    def drain(self, chunk=None):
+        """Writes the passed chunk and returns everything written since
+        the last drain (rather than flushing it into the body).
+
+        Used to hand the chunks of a synchronous streaming response
+        directly to the HTTP connector.
+        """
+
+        # Ensure we're not closed.
+        self.require_not_closed()
+
+        # Take anything flushed since the last drain.
+        body = self.body
+        if body is not None:
+            self.body = None
+
+        if not self._chunks and isinstance(chunk, six.string_types):
+            # Nothing is buffered; pass the chunk through as it is.
+            if type(chunk) is not six.binary_type:
+                chunk = self._encode(chunk)
+
+            self._length += len(chunk)
+
+        else:
+            # Write the chunk and pull out the accumulated bytes.
+            self.write(chunk)
+            chunk = self._pull()
+
+        return body + chunk if body else chunk
+
+    def _pull(self):
+        # Pull out the bytes written since the last flush; a single chunk
+        # is passed on as it is (rather than copied).
+        chunks, self._chunks = self._chunks, []
+        if len(chunks) == 1:
+            return chunks[0]
+
+        return b''.join(chunks)
+
     def send(self, *args, **kwargs):
         """Writes the passed chunk and flushes it to the client."""
         self.write(*args, **kwargs)
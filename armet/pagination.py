@@ -3,11 +3,34 @@
 Implementation of a pagination interface using a combination of the HTTP/1.1
 range header and set specifiers.
 """
+import six
+import json
+import base64
+from collections import Iterator
 from armet.http import exceptions, client
+from armet.query import parser
 
 #! The range specifier to use.
 RANGE_SPECIFIER = 'items'
 
+#! The range specifier to use for keyset (cursor) pagination.
+CURSOR_SPECIFIER = 'cursor'
+
+#! The response header that holds the cursor of the next page.
+CURSOR_HEADER = 'Cursor'
+
+#! The largest page length of a cursor (where the resource declares no
+#! maximum page size); larger limits overflow the databases.
+MAX_CURSOR_LIMIT = 2 ** 31 - 1
+
+#! Strategies to count the items of a list (see `count`).
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATED = 'estimated'
+COUNT_NONE = 'none'
+
+COUNT_STRATEGIES = (COUNT_EXACT, COUNT_CACHED, COUNT_ESTIMATED, COUNT_NONE)
+
 
 def parse(specifiers):
     """
@@ -67,10 +90,23 @@ def paginate(request, response, items):
     # TODO: support multi-part range requests
 
     # Get the header
+    meta = request.resource.meta
     header = request.headers.get('Range')
-    if not header:
-        # No range header; move along.
-        return items
+    defaulted = not header
+    if defaulted:
+        size = meta.default_page_size or meta.max_page_size
+        if size is None:
+            # No range header; move along.
+            return items
+
+        # Respond with the first page (of the largest size allowed where
+        # no default is declared).
+        header = '%s=0-%d' % (RANGE_SPECIFIER, size - 1)
+
+    # Keyset pagination; seek past the cursor.
+    prefix = CURSOR_SPECIFIER + '='
+    if header.find(prefix) == 0:
+        return seek(request, response, items, header[len(prefix):].strip())
 
     # do some validation
     prefix = RANGE_SPECIFIER + '='
@@ -87,14 +123,183 @@ def paginate(request, response, items):
             'Multiple ranges in a single request is not yet supported.')
     start, end = ranges[0]
 
+    if meta.max_page_size is not None:
+        # Clamp the range to the largest page allowed.
+        end = min(end, start + meta.max_page_size - 1)
+
+    if isinstance(items, Iterator):
+        # A lazy iterable must be resolved to be counted and sliced.
+        items = list(items)
+
+    # Count the items (if the strategy for the request does so).
+    max_length = count(request, response, items)
+
+    if max_length is None:
+        # Resolve the page to report how far it extends.
+        items = list(items[start:end + 1])
+        if not items:
+            if defaulted:
+                # Nothing to page; respond with the empty list.
+                return items
+
+            raise exceptions.RequestedRangeNotSatisfiable()
+
+        response.status = client.PARTIAL_CONTENT
+        response.headers['Accept-Ranges'] = RANGE_SPECIFIER
+
+        end = start + len(items) - 1
+        response.headers['Content-Range'] = '%d-%d/*' % (start, end)
+        return items
+
+    if not max_length:
+        # Nothing to page (there is no range of an empty list); respond
+        # with the empty list.
+        return []
+
+    response.status = client.PARTIAL_CONTENT
+    response.headers['Accept-Ranges'] = RANGE_SPECIFIER
+
     # Make sure the length is not higher than the total number allowed.
-    max_length = request.resource.count(items)
     end = min(end, max_length)
 
-    response.status = client.PARTIAL_CONTENT
     response.headers['Content-Range'] = '%d-%d/%d' % (start, end, max_length)
-    response.headers['Accept-Ranges'] = RANGE_SPECIFIER
 
     # Splice and return the items.
     items = items[start:end + 1]
     return items
+
+
+def preferences(request):
+    """Parse the `Prefer` header of the request (RFC 7240) into a
+    dictionary of preferences.
+    """
+    result = {}
+    for preference in request.headers.get('Prefer', '').split(','):
+        # Parameters of a preference (after a `;`) are ignored.
+        name, _, value = preference.split(';')[0].partition('=')
+        if name.strip():
+            result[name.strip().lower()] = value.strip().strip('"')
+
+    return result
+
+
+def count(request, response, items):
+    """Count the items using the strategy of the resource; returns `None`
+    if the items are not to be counted.
+
+    The client may select another of the strategies allowed by the
+    resource with a `Prefer: count=<strategy>` header.
+    """
+    resource = request.resource
+    strategy = resource.meta.count_strategy
+
+    preferred = preferences(request).get('count')
+    if preferred in resource.meta.count_strategies:
+        strategy = preferred
+        response.headers['Preference-Applied'] = 'count=%s' % strategy
+
+    if strategy == COUNT_NONE:
+        return None
+
+    if strategy == COUNT_ESTIMATED:
+        return resource.estimate(items)
+
+    if strategy == COUNT_CACHED:
+        # Counts are cached by the normalized query and the user (as the
+        # user may be authorized to see a different set of items).
+        query = parser.parse(request.query).parsed if request.query else None
+        key = query, request.user
+
+        try:
+            value = resource.meta.count_cache.get(key)
+
+        except TypeError:
+            # The user is not hashable; count exactly.
+            return resource.count(items)
+
+        if value is None:
+            value = resource.meta.count_cache[key] = resource.count(items)
+
+        return value
+
+    return resource.count(items)
+
+
+def encode_cursor(limit, values):
+    """Encode the page length and the key values of the last item of a page
+    into an opaque cursor.
+    """
+    text = json.dumps([limit, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into the page length and the key values of the
+    item to seek past (`None` for the first page).
+
+    A cursor is either the page length (eg. `Range: cursor=25` for the first
+    page) or a cursor returned in the `Cursor` header of the previous page.
+    """
+    if cursor.isdigit():
+        return int(cursor), None
+
+    try:
+        text = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        limit, values = json.loads(text.decode('utf-8'))
+
+    except (TypeError, ValueError, UnicodeError):
+        raise exceptions.RequestedRangeNotSatisfiable()
+
+    if (not isinstance(limit, six.integer_types) or isinstance(limit, bool)
+            or not isinstance(values, list)):
+        raise exceptions.RequestedRangeNotSatisfiable()
+
+    return limit, values
+
+
+def seek(request, response, items, cursor):
+    """Paginate an iterable by seeking past the sort keys of the last item
+    of the previous page (rather than by offset).
+
+    The items are ordered by the sort directives of the query followed by
+    the slug; the resource applies this order and the seek condition
+    (eg. `WHERE (key) > (:last) ORDER BY key LIMIT n`). Sort keys are
+    expected to not be null.
+    """
+    resource = request.resource
+    if not hasattr(resource, 'seek'):
+        # The resource cannot apply a seek condition.
+        raise exceptions.RequestedRangeNotSatisfiable()
+
+    limit, values = decode_cursor(cursor)
+    if limit < 1:
+        raise exceptions.RequestedRangeNotSatisfiable()
+
+    if resource.meta.max_page_size is not None:
+        # Clamp the page to the largest page allowed.
+        limit = min(limit, resource.meta.max_page_size)
+
+    if limit > MAX_CURSOR_LIMIT:
+        raise exceptions.RequestedRangeNotSatisfiable()
+
+    keys = resource.cursor_keys()
+    if values is not None:
+        if len(values) != len(keys):
+            # The cursor is from a differently sorted list.
+            raise exceptions.RequestedRangeNotSatisfiable()
+
+        values = resource.cursor_clean(keys, values)
+
+    # Fetch an extra item to know if there is a next page.
+    items = list(resource.seek(items, keys, values)[:limit + 1])
+
+    response.status = client.PARTIAL_CONTENT
+    response.headers['Accept-Ranges'] = RANGE_SPECIFIER
+
+    if len(items) > limit:
+        # Return the cursor of the next page.
+        items = items[:limit]
+        values = resource.cursor_values(keys, items[-1])
+        response.headers[CURSOR_HEADER] = encode_cursor(limit, values)
+
+    return items
@@ -31,6 +31,21 @@ OPERATOR_ISNULL = 'isnull', None
 #! Contains (x in y)
 OPERATOR_ICONTAINS = 'icontains', None
 
+#! Membership (x is one of the values)
+OPERATOR_IN = 'in', None
+
+#! Inclusive range (x is between the two values; foo.between=a,b)
+OPERATOR_BETWEEN = 'between', None
+
+#! Prefix
+OPERATOR_STARTSWITH = 'startswith', None
+
+#! Case-insensitive prefix
+OPERATOR_ISTARTSWITH = 'istartswith', None
+
+#! Full-text search (foo.search=bar); matches every word of a value
+OPERATOR_SEARCH = 'search', None
+
 #! The fallback to use in the case that a more specific one isn't defined.
 OPERATOR_FALLBACK = OPERATOR_IEQUAL
 OPERATOR_SUFFIX_FALLBACK = OPERATOR_FALLBACK[0]
@@ -51,6 +66,12 @@ OPERATOR_MAP = {
     OPERATOR_REGEX: lambda x, y: re.search(y, x),
     OPERATOR_ISNULL: lambda x: x is None,
     OPERATOR_ICONTAINS: operator.contains,
+    OPERATOR_IN: lambda x, y: x == y,
+    OPERATOR_BETWEEN: lambda x, y, z: y <= x <= z,
+    OPERATOR_STARTSWITH: lambda x, y: x.startswith(y),
+    OPERATOR_ISTARTSWITH: lambda x, y: x.lower().startswith(y.lower()),
+    OPERATOR_SEARCH: lambda x, y: set(y.lower().split()) <= set(
+        x.lower().split()),
 }
 
 #! Operator set containing all operators.
@@ -74,6 +95,30 @@ OPERATOR_EQUALITY_MAP = dict(
            map(lambda x: (x[0][1], x[1]),
                OPERATOR_MAP.items())))
 
+#! Maximum length of a regular expression (`foo*=bar`); longer patterns
+#! are refused rather than handed to the regular expression engine.
+REGEX_MAX_LENGTH = 256
+
+#! Maximum depth of a parsed query (of nested groups and of segments
+#! chained by combinators); parsed queries are compared, cached and
+#! compiled recursively.
+QUERY_MAX_DEPTH = 64
+
+#! Meanings of case-insensitive equality (`foo=bar`) on text; equality
+#! on other types is always exact.
+EQUALITY_EXACT = 'exact'
+EQUALITY_IEXACT = 'iexact'
+EQUALITY_PREFIX = 'prefix'
+EQUALITY_SUBSTRING = 'substring'
+
+#! Map of the meanings of equality to the operator compared with.
+EQUALITY_MAP = {
+    EQUALITY_EXACT: OPERATOR_MAP[OPERATOR_EQUAL],
+    EQUALITY_IEXACT: OPERATOR_MAP[OPERATOR_IEQUAL],
+    EQUALITY_PREFIX: OPERATOR_MAP[OPERATOR_ISTARTSWITH],
+    EQUALITY_SUBSTRING: OPERATOR_MAP[OPERATOR_ICONTAINS],
+}
+
 #! Negation
 PATH_NEGATION = 'not'
 OPERATOR_NEGATION = '!'
@@ -96,3 +141,17 @@ DIRECTIVE = ':'
 #! Grouping characters
 GROUP_BEGIN = '('
 GROUP_END = ')'
+
+#! Sort directives (foo:asc)
+SORT_ASCENDING = 'asc'
+SORT_DESCENDING = 'desc'
+
+SORT_DIRECTIVES = {
+    SORT_ASCENDING: False,
+    SORT_DESCENDING: True,
+}
+
+#! Rank directive (foo.search:rank=bar); orders the items of a search
+#! by relevance (before any sort directives); refused by the Django
+#! connector, which has no relevance to order by.
+SEARCH_RANK = 'rank'
@@ -3,9 +3,18 @@ from __future__ import absolute_import, unicode_literals, division
 import six
 from six.moves import cStringIO as StringIO
 import operator
-import itertools
+import re
+from armet import utils
 from . import constants
 
+try:
+    # The internals of the regular expression engine (3.11+).
+    from re import _parser as sre_parse, _constants as sre_constants
+
+except ImportError:
+    import sre_parse
+    import sre_constants
+
 
 #! Operation to combinator map.
 COMBINATORS = {
@@ -31,46 +40,100 @@ REVERSED_OPERATOR_SUFFIX_MAP = dict(
 )
 
 
-class Query(object):
+class Node(object):
+    """Base of the nodes that make up a parsed query.
+
+    Nodes are immutable and hashable so that a parsed query may be cached
+    and shared between requests (and threads). Hashes are computed once
+    as the tree is built from the bottom up.
+    """
+
+    __slots__ = ('_hash',)
+
+    #! Names of the fields that identify the node.
+    _fields = ()
+
+    def _freeze(self, **fields):
+        for name in self._fields:
+            object.__setattr__(self, name, fields[name])
+
+        object.__setattr__(self, '_hash', hash(self._key()))
+
+    def _key(self):
+        return (type(self),) + tuple(getattr(self, x) for x in self._fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return (type(self) is type(other)
+                and self._hash == other._hash
+                and self._key() == other._key())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return str(self)
+
+
+class Query(Node):
     """Represents a complete query expression.
     """
 
+    __slots__ = _fields = ('original', 'parsed')
+
     def __init__(self, original, parsed):
         # Keep a copy of the original querystring.
-        self.original = original
-        self.parsed = parsed
+        self._freeze(original=original, parsed=parsed)
+
+    def __str__(self):
+        return str(self.parsed)
 
 
-class QuerySegment(object):
+class QuerySegment(Node):
     """
     Represents a single query segment with a subject path (`x.a.g`),
     an operator (`=` or `<=`), optional directives (`sort`), and
     a set of values (`5,12,56`).
     """
 
+    __slots__ = _fields = (
+        'path', 'operator', 'negated', 'directives', 'values')
+
     def __init__(self, **kwargs):
-        #! Path to the attribute being tested (as a list of segments).
-        self.path = kwargs.get('path', [])
+        self._freeze(
+            #! Path to the attribute being tested (as a tuple of segments).
+            path=tuple(kwargs.get('path', ())),
 
-        #! This is the operator that is being applied to the attribute path.
-        self.operator = kwargs.get(
-            'operator',
-            constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL]
-        )
+            #! This is the operator that is being applied to the
+            #! attribute path.
+            operator=kwargs.get(
+                'operator',
+                constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL]),
 
-        #! Negation; if this operation has been negated.
-        self.negated = kwargs.get('negated', False)
+            #! Negation; if this operation has been negated.
+            negated=kwargs.get('negated', False),
 
-        #! Directives. Directives are a key-value way of specifying commands
-        #! on an attribute path.
-        self.directives = kwargs.get('directives', [])
+            #! Directives. Directives are a key-value way of specifying
+            #! commands on an attribute path.
+            directives=tuple(kwargs.get('directives', ())),
 
-        #! Values. Set of values that the attribute path is being checked
-        #! against. Only one has to match.
-        self.values = kwargs.get('values', [])
-
-    def __repr__(self):
-        return str(self)
+            #! Values. Set of values that the attribute path is being
+            #! checked against. Only one has to match.
+            values=tuple(kwargs.get('values', ())))
 
     def __str__(self):
         """
@@ -96,31 +159,30 @@ class QuerySegment(object):
         return o.getvalue()
 
 
-class NoopQuerySegment(object):
+class NoopQuerySegment(Node):
     """A query segment that doesn't perform an operation.  For the purposes
     of binary and unary combinations, this should be treated as True.
     A NoopQuerySegment should only be encountered when the entire query string
     is missing."""
 
-    def __repr__(self):
-        return str(self)
+    __slots__ = ()
+
+    def __init__(self):
+        self._freeze()
 
     def __str__(self):
         return "TRUE"
 
 
-class BinarySegmentCombinator(object):
+class BinarySegmentCombinator(Node):
     """
     Represents the combination of 2 query segments `(x=y)&(y=z)`
     """
 
-    def __init__(self, left, right, operation=operator.and_):
-        self.left = left
-        self.right = right
-        self.operation = operation
+    __slots__ = _fields = ('left', 'right', 'operation')
 
-    def __repr__(self):
-        return str(self)
+    def __init__(self, left, right, operation=operator.and_):
+        self._freeze(left=left, right=right, operation=operation)
 
     def __str__(self):
         combinators = {
@@ -135,217 +197,228 @@ class BinarySegmentCombinator(object):
         )
 
 
-class UnarySegmentCombinator(object):
+class UnarySegmentCombinator(Node):
     """
     Represents a unary combination of 2 query segments. `!(x=y)`
     """
-    def __init__(self, operand, operation=operator.not_):
-        self.operand = operand
-        self.operation = operation
 
-    def __repr__(self):
-        return str(self)
+    __slots__ = _fields = ('operand', 'operation')
+
+    def __init__(self, operand, operation=operator.not_):
+        self._freeze(operand=operand, operation=operation)
 
     def __str__(self):
         return "{} {}".format('NOT', self.operand)
 
 
+#! Maximum number of parsed query strings to retain.
+CACHE_SIZE = 512
+
+
 def parse(text, encoding='utf8'):
-    """Parse the querystring into a normalized form."""
+    """Parse the querystring into a normalized form.
+
+    The parsed query is immutable and is memoized on the query string;
+    `parse.cache_info()` reports the hit and miss counts of the cache.
+    """
 
     # Decode the text if we got bytes.
     if isinstance(text, six.binary_type):
         text = text.decode(encoding)
 
+    return _parse(text)
+
+
+@utils.lru_cache(CACHE_SIZE)
+def _parse(text):
     return Query(text, split_segments(text))
 
 
-def reset_stringio(buf):
-    # This combination of functions happens way too often in here.
-    buf.truncate(0)
-    buf.seek(0)
+parse.cache_info = _parse.cache_info
+parse.cache_clear = _parse.cache_clear
 
 
-def split_segments(text, closing_paren=False):
-    """Return objects representing segments."""
-    buf = StringIO()
+#! Regular expression that splits a query string into tokens. Each
+#! alternative is a named group; the `text` of a segment is anything
+#! that is not a grouping character or a combinator.
+TOKENS = re.compile(r'''
+    (?P<negate>{negation}{begin})
+    |(?P<begin>{begin})
+    |(?P<end>{end})
+    |(?P<combinator>[{combinators}])
+    |(?P<text>[^{begin}{end}{combinators}]+)
+'''.format(
+    negation=re.escape(constants.OPERATOR_NEGATION),
+    begin=re.escape(constants.GROUP_BEGIN),
+    end=re.escape(constants.GROUP_END),
+    combinators=re.escape(''.join(COMBINATORS))), re.VERBOSE)
 
-    # The segments we're building, and the combinators used to combine them.
-    # Note that after this is complete, this should be true:
-    # len(segments) == len(combinators) + 1
-    # Thus we can understand the relationship between segments and combinators
-    # like so:
-    #  s1 (c1) s2 (c2) s3 (c3) where sN are segments and cN are combination
-    # functions.
-    # TODO: Figure out exactly where the querystring died and post cool
-    # error messages about it.
-    segments = []
-    combinators = []
 
-    # A flag dictating if the last character we processed was a group.
-    # This is used to determine if the next character (being a combinator)
-    # is allowed to
-    last_group = False
+#! Regular expression that finds the first equality operator in a segment;
+#! longer operators are tried first so that `<=` is preferred over `<`.
+OPERATOR_EQUALITY = re.compile('|'.join(map(re.escape, sorted(
+    constants.OPERATOR_EQUALITIES, key=len, reverse=True))))
 
-    # The recursive nature of this function relies on keeping track of the
-    # state of iteration.  This iterator will be passed down to recursed calls.
-    iterator = iter(text)
 
-    # Detection for exclamation points.  only matters for this situation:
-    # foo=bar&!(bar=baz)
-    last_negation = False
+class Group(object):
+    """Parse state of a (possibly negated) parenthesized group."""
 
-    for character in iterator:
-        if character in COMBINATORS:
+    __slots__ = ('node', 'depth', 'combinator', 'negated', 'position')
 
-            if last_negation:
-                buf.write(constants.OPERATOR_NEGATION)
+    def __init__(self, negated=False, position=0):
+        #! The segments of the group combined so far.
+        self.node = None
 
-            # The string representation of our segment.
-            val = buf.getvalue()
-            reset_stringio(buf)
+        #! The depth of the combined segments.
+        self.depth = 0
 
-            if not last_group and not len(val):
-                raise ValueError('Unexpected %s.' % character)
+        #! The combinator waiting for its right-hand operand.
+        self.combinator = None
 
-            # When a group happens, the previous value is empty.
-            if len(val):
-                segments.append(parse_segment(val))
+        #! If the group is to be negated once closed.
+        self.negated = negated
 
-            combinators.append(COMBINATORS[character])
+        #! Position of the opening parenthesis (for error reporting).
+        self.position = position
 
-        elif character == constants.GROUP_BEGIN:
-            # Recursively go into the next group.
+    @property
+    def expecting(self):
+        # An operand is expected at the start of a group or directly
+        # following a combinator.
+        return self.node is None or self.combinator is not None
 
-            if buf.tell():
-                raise ValueError('Unexpected %s' % character)
+    def push(self, node, depth=1):
+        if self.node is None:
+            self.node = node
+            self.depth = depth
 
-            seg = split_segments(iterator, True)
+        else:
+            # Combinators are applied from left to right.
+            self.node = BinarySegmentCombinator(
+                self.node, node, self.combinator)
 
-            if last_negation:
-                seg = UnarySegmentCombinator(seg)
+            self.depth = max(self.depth, depth) + 1
 
-            segments.append(seg)
+        if self.depth > constants.QUERY_MAX_DEPTH:
+            raise ValueError('Queries may be nested at most %d deep.' % (
+                constants.QUERY_MAX_DEPTH))
 
-            # Flag that the last entry was a grouping, so that we don't panic
-            # when the next character is a logical combinator
-            last_group = True
-            continue
+        self.combinator = None
 
-        elif character == constants.GROUP_END:
-            # Build the segment for anything remaining, and then combine
-            # all the segments.
-            val = buf.getvalue()
 
-            # Check for unbalanced parens or an empty thing: foo=bar&();bar=baz
-            if not buf.tell() or not closing_paren:
-                raise ValueError('Unexpected %s' % character)
+def split_segments(text):
+    """Return objects representing segments.
 
-            segments.append(parse_segment(val))
-            return combine(segments, combinators)
+    The query string is tokenized and parsed in a single pass; groups are
+    tracked on an explicit stack. The parsed query may be at most
+    `QUERY_MAX_DEPTH` deep.
+    """
 
-        elif character == constants.OPERATOR_NEGATION and not buf.tell():
-            last_negation = True
-            continue
+    # The group being parsed is always at the top of the stack; the query
+    # string as a whole is an implicit group.
+    stack = [Group()]
+    group = stack[-1]
 
-        else:
-            if last_negation:
-                buf.write(constants.OPERATOR_NEGATION)
-            if last_group:
-                raise ValueError('Unexpected %s' % character)
-            buf.write(character)
-
-        last_negation = False
-        last_group = False
-    else:
-        # Check and see if the iterator exited early (unbalanced parens)
-        if closing_paren:
-            raise ValueError('Expected %s.' % constants.GROUP_END)
+    position = 0
+    for match in TOKENS.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        position = match.start()
 
-        if not last_group:
-            # Add the final segment.
-            segments.append(parse_segment(buf.getvalue()))
+        if kind == 'combinator':
+            if group.expecting:
+                raise ValueError(
+                    'Unexpected %s at position %d.' % (token, position))
 
-    # Everything completed normally, combine all the segments into one
-    # and return them.
-    return combine(segments, combinators)
+            group.combinator = COMBINATORS[token]
 
+        elif kind == 'end':
+            if group.expecting or len(stack) == 1:
+                raise ValueError(
+                    'Unexpected %s at position %d.' % (token, position))
 
-def combine(segments, combinators):
-    # We get [a,b,c] in segments and combinators that should be applied as
-    # [a(op)b, result(op)c]
-    operands = iter(segments)
-    operators = iter(combinators)
-    first = next(operands)
-    reducer = lambda x, y: BinarySegmentCombinator(x, y, next(operators))
-    return six.moves.reduce(reducer, operands, first)
+            # Close the group and hand it off to the enclosing group.
+            node, depth = group.node, group.depth
+            if group.negated:
+                node = UnarySegmentCombinator(node)
+                depth += 1
 
+            stack.pop()
+            group = stack[-1]
+            group.push(node, depth)
 
-def parse_directive(key):
-    """
-    Takes a key of type (foo:bar) and returns either the key and the
-    directive, or the key and None (for no directive.)
-    """
-    if constants.DIRECTIVE in key:
-        return key.split(constants.DIRECTIVE, 1)
-    else:
-        return key, None
+        elif not group.expecting:
+            # Operands must be separated by a combinator.
+            raise ValueError(
+                'Unexpected %s at position %d.' % (token[0], position))
+
+        elif kind == 'text':
+            group.push(parse_segment(token))
+
+        else:
+            # Open a new (possibly negated) group.
+            group = Group(kind == 'negate', position)
+            stack.append(group)
+
+    if len(stack) > 1:
+        raise ValueError('Expected %s to close the group at position %d.' % (
+            constants.GROUP_END, stack[-1].position))
+
+    if group.node is None or group.combinator is not None:
+        # Either an empty query string or a trailing combinator
+        # (eg. `foo=bar&`); both are treated as a no-op.
+        group.push(NoopQuerySegment())
+
+    return group.node
 
 
 def parse_segment(text):
-    "we expect foo=bar"
+    """Parse a segment of the form `path[:directive..][operator][values]`.
+    """
 
     if not len(text):
         return NoopQuerySegment()
 
-    q = QuerySegment()
-
-    # First we need to split the segment into key/value pairs.  This is done
-    # by attempting to split the sequence for each equality comparison.  Then
-    # discard any that did not split properly.  Then chose the smallest key
-    # (greedily chose the first comparator we encounter in the string)
-    # followed by the smallest value (greedily chose the largest comparator
-    # possible.)
-
-    # translate into [('=', 'foo=bar')]
-    equalities = zip(constants.OPERATOR_EQUALITIES, itertools.repeat(text))
-    # Translate into [('=', ['foo', 'bar'])]
-    equalities = map(lambda x: (x[0], x[1].split(x[0], 1)), equalities)
-    # Remove unsplit entries and translate into [('=': ['foo', 'bar'])]
-    # Note that the result from this stage is iterated over twice.
-    equalities = list(filter(lambda x: len(x[1]) > 1, equalities))
-    # Get the smallest key and use the length of that to remove other items
-    key_len = len(min((x[1][0] for x in equalities), key=len))
-    equalities = filter(lambda x: len(x[1][0]) == key_len, equalities)
-
-    # Get the smallest value length. thus we have the earliest key and the
-    # smallest value.
-    op, (key, value) = min(equalities, key=lambda x: len(x[1][1]))
-
-    key, directive = parse_directive(key)
-    if directive:
+    # Segments are immutable; gather the fields before constructing one.
+    negated = False
+    directives = ()
+    values = ()
+
+    # Split the segment on the first (and longest) equality operator.
+    match = OPERATOR_EQUALITY.search(text)
+    if match is not None:
+        op = match.group()
+        key, value = text[:match.start()], text[match.end():]
+        values = value.split(constants.SEP_VALUE)
+
+    elif constants.DIRECTIVE in text:
+        # A segment of only directives (eg. `foo:asc`) has no values.
         op = constants.OPERATOR_EQUALITY_FALLBACK
-        q.directive = directive
+        key = text
+
+    else:
+        raise ValueError('No operator provided in "%s".' % text)
+
+    # Split off any directives (eg. `foo:asc`).
+    path = key.split(constants.DIRECTIVE)
+    if len(path) > 1:
+        directives = path[1:]
 
     # Process negation.  This comes in both foo.not= and foo!= forms.
-    path = key.split(constants.SEP_PATH)
-    last = path[-1]
+    path = path[0].split(constants.SEP_PATH)
 
     # Check for !=
-    if last.endswith(constants.OPERATOR_NEGATION):
-        last = last[:-1]
-        q.negated = not q.negated
+    if path[-1].endswith(constants.OPERATOR_NEGATION):
+        path[-1] = path[-1][:-1]
+        negated = not negated
 
     # Check for foo.not=
-    if last == constants.PATH_NEGATION:
+    if path[-1] == constants.PATH_NEGATION:
         path.pop(-1)
-        q.negated = not q.negated
-
-    q.values = value.split(constants.SEP_VALUE)
+        negated = not negated
 
     # Check for suffixed operators (foo.gte=bar).  Prioritize suffixed
     # entries over actual equality checks.
-    if path[-1] in constants.OPERATOR_SUFFIXES:
+    if path and path[-1] in constants.OPERATOR_SUFFIXES:
 
         # The case where foo.gte<=bar, which obviously makes no sense.
         if op not in constants.OPERATOR_FALLBACK:
@@ -353,14 +426,152 @@ def parse_segment(text):
                 'Both path-style operator and equality style operator '
                 'provided.  Please provide only a single style operator.')
 
-        q.operator = constants.OPERATOR_SUFFIX_MAP[path[-1]]
+        operation = constants.OPERATOR_SUFFIX_MAP[path[-1]]
         path.pop(-1)
     else:
-        q.operator = constants.OPERATOR_EQUALITY_MAP[op]
+        operation = constants.OPERATOR_EQUALITY_MAP[op]
+
+    if (operation is constants.OPERATOR_MAP[constants.OPERATOR_BETWEEN]
+            and len(values) != 2):
+        raise ValueError('A range requires two values in "%s".' % text)
+
+    if operation is constants.OPERATOR_MAP[constants.OPERATOR_REGEX]:
+        # Refuse patterns up front rather than in the database.
+        for value in values:
+            validate_regex(value)
 
     if not len(path):
         raise ValueError('No attribute navigation path provided.')
 
-    q.path = path
+    if not all(path):
+        raise ValueError('Empty attribute name in "%s".' % text)
+
+    return QuerySegment(
+        path=path,
+        operator=operation,
+        negated=negated,
+        directives=directives,
+        values=values)
+
+
+def ranking(query):
+    """Collect the searches (`foo.search=bar`) of the passed query that
+    order the items by relevance (`foo.search:rank=bar`).
+    """
+
+    search = constants.OPERATOR_MAP[constants.OPERATOR_SEARCH]
+    return [segment for segment in walk(query)
+            if segment.operator is search
+            and constants.SEARCH_RANK in segment.directives]
+
+
+#! Opcodes of a parsed regular expression that repeat what they hold.
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+#! Opcodes of a parsed regular expression that refer back to a group.
+_GROUPREFS = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+
+
+def _check_backtracking(items, repeated=False):
+    # Refuse what may backtrack exponentially (in the engine of python
+    # on SQLite and in most others): a repetition or an alternation
+    # within a repetition (eg. `(a+)+` or `(a|aa)+`) and references back
+    # to groups.
+    for op, value in items:
+        if op in _GROUPREFS:
+            raise ValueError(
+                'Regular expressions may not refer back to groups.')
+
+        if op in _REPEATS:
+            low, high, item = value
+            if repeated and high > 1:
+                raise ValueError(
+                    'Regular expressions may not nest repetitions.')
+
+            _check_backtracking(item, repeated or high > 1)
+
+        elif op == sre_constants.SUBPATTERN:
+            # The pattern of the group is last (after its flags).
+            _check_backtracking(value[-1], repeated)
+
+        elif op == sre_constants.BRANCH:
+            if repeated:
+                raise ValueError(
+                    'Regular expressions may not repeat alternations.')
+
+            for item in value[1]:
+                _check_backtracking(item, repeated)
+
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _check_backtracking(value[1], repeated)
+
+
+def validate_regex(pattern):
+    """Assert that the passed regular expression is well-formed, no
+    longer than `REGEX_MAX_LENGTH` and does not nest repetitions (or
+    repeat alternations) or refer back to groups; which may backtrack
+    exponentially.
+    """
+
+    if len(pattern) > constants.REGEX_MAX_LENGTH:
+        raise ValueError(
+            'Regular expressions may be at most %d characters long.' %
+            constants.REGEX_MAX_LENGTH)
+
+    try:
+        re.compile(pattern)
+
+    except re.error as ex:
+        raise ValueError(
+            'Malformed regular expression "%s": %s.' % (pattern, ex))
+
+    _check_backtracking(sre_parse.parse(pattern))
+
+
+def walk(query):
+    """Iterate over the segments of the passed query (from left to right).
+    """
+
+    # Walk the tree with an explicit stack as it may be deeply nested.
+    stack = [query]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, QuerySegment):
+            yield node
+
+        elif isinstance(node, BinarySegmentCombinator):
+            stack.append(node.right)
+            stack.append(node.left)
+
+        elif isinstance(node, UnarySegmentCombinator):
+            stack.append(node.operand)
+
+        elif isinstance(node, Query):
+            stack.append(node.parsed)
+
+
+def sorting(query):
+    """Collect the sort directives (`foo:asc`, `foo:desc`) of the
+    passed query as a list of `(path, descending)` tuples.
+    """
+
+    ordering = []
+    for segment in walk(query):
+        for directive in segment.directives:
+            if directive in constants.SORT_DIRECTIVES:
+                ordering.append(
+                    (segment.path, constants.SORT_DIRECTIVES[directive]))
+
+    return ordering
+
+
+def resolve_operator(segment, attribute):
+    """Resolve the operator the passed segment compares with; equality
+    (`foo=bar`) compares as resolved for the attribute (see `equality`).
+    """
+
+    if (segment.operator is constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL]
+            and attribute.equality_operator is not None):
+        return attribute.equality_operator
 
-    return q
+    return segment.operator
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Compiles a parsed query into a python predicate.
+
+Used to filter the items of resources that are not bound to a model
+(and so cannot have the query translated for a database).
+"""
+from __future__ import absolute_import, unicode_literals, division
+import re
+import six
+import operator
+from functools import partial
+from armet.attributes import Attribute, BooleanAttribute
+from armet.http import exceptions
+from . import parser, constants
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, six.string_types) else value
+
+
+def _set(values):
+    try:
+        # Test membership in a set where the values are hashable.
+        return frozenset(values)
+
+    except TypeError:
+        return list(values)
+
+
+def exact(values):
+    values = _set(values)
+    return lambda x: x in values
+
+
+def iexact(values):
+    # Lower-case the values once; each item is lower-cased as it is tested.
+    values = _set(map(_lower, values))
+    return lambda x: _lower(x) in values
+
+
+def ordering(op):
+    def compile(values):
+        # Null values compare as unknown (rather than as on python 2,
+        # where `None < 3`).
+        values = [y for y in values if y is not None]
+        if not values:
+            return lambda x: None
+
+        return lambda x: any(op(x, y) for y in values)
+
+    return compile
+
+
+def regex(values):
+    patterns = [re.compile(six.text_type(y)).search for y in values]
+    return lambda x: any(search(x) for search in patterns)
+
+
+def icontains(values):
+    values = list(map(_lower, values))
+    return lambda x: any(y in _lower(x) for y in values)
+
+
+def between(values):
+    low, high = values
+    if low is None or high is None:
+        return lambda x: None
+
+    return lambda x: low <= x <= high
+
+
+def startswith(values):
+    return lambda x: any(x.startswith(y) for y in values)
+
+
+def istartswith(values):
+    values = list(map(_lower, values))
+    return lambda x: any(_lower(x).startswith(y) for y in values)
+
+
+def _words(value):
+    return re.findall(r'\w+', _lower(six.text_type(value)), re.UNICODE)
+
+
+def search(values):
+    # Match every word of any of the values (as a full-text search).
+    values = [set(_words(y)) for y in values]
+    return lambda x: any(y <= set(_words(x)) for y in values)
+
+
+def isnull(values):
+    # The values of a null test are flags (eg. `foo.isnull=false`); any
+    # flag that is not false tests for null.
+    values = set(BooleanAttribute().try_clean(y) is not False for y in values)
+    return lambda x: (x is None) in values
+
+
+#! Map of operators to functions that compile the cleaned values of
+#! a segment into a test of the value of an item.
+OPERATOR_MAP = {
+    constants.OPERATOR_EQUAL: exact,
+    constants.OPERATOR_IEQUAL: iexact,
+    constants.OPERATOR_LT: ordering(operator.lt),
+    constants.OPERATOR_LTE: ordering(operator.le),
+    constants.OPERATOR_GT: ordering(operator.gt),
+    constants.OPERATOR_GTE: ordering(operator.ge),
+    constants.OPERATOR_REGEX: regex,
+    constants.OPERATOR_ISNULL: isnull,
+    constants.OPERATOR_ICONTAINS: icontains,
+    constants.OPERATOR_IN: exact,
+    constants.OPERATOR_BETWEEN: between,
+    constants.OPERATOR_STARTSWITH: startswith,
+    constants.OPERATOR_ISTARTSWITH: istartswith,
+    constants.OPERATOR_SEARCH: search,
+}
+
+# Rewire the map.
+OPERATOR_MAP = dict(
+    (constants.OPERATOR_MAP[k], v) for k, v in OPERATOR_MAP.items()
+)
+
+#! Operators that test null (`None`) values of an item; any other test of
+#! a null value is unknown.
+NULL_OPERATORS = frozenset(constants.OPERATOR_MAP[x] for x in (
+    constants.OPERATOR_EQUAL, constants.OPERATOR_IEQUAL,
+    constants.OPERATOR_IN, constants.OPERATOR_ISNULL))
+
+#! Operators whose values are not values of the attribute.
+UNCLEANED_OPERATORS = frozenset(constants.OPERATOR_MAP[x] for x in (
+    constants.OPERATOR_ISNULL, constants.OPERATOR_REGEX,
+    constants.OPERATOR_SEARCH))
+
+
+def segment_predicate(resource, segment, attributes, cleaners):
+
+    if not segment.values:
+        # A segment of only directives (eg. `foo:asc`) does not filter.
+        return noop_predicate()
+
+    attribute = attributes.get(segment.path[0])
+    if attribute is None:
+        raise exceptions.BadRequest({
+            '__all__': "Unable to filter by '%s'." % '.'.join(segment.path)})
+
+    # Resolve the value of a path that extends beyond the attribute
+    # through an attribute declared for the whole path.
+    get = attribute.get
+    if len(segment.path) > 1:
+        path = [attribute.path] + list(segment.path[1:])
+        get = Attribute('.'.join(path)).get
+
+    # Clean the values once; the null test takes flags (and regular
+    # expressions and searches take text) rather than values.
+    if segment.operator in UNCLEANED_OPERATORS:
+        values = segment.values
+
+    else:
+        clean = partial(cleaners[attribute.name], resource)
+        values = [clean(attribute.try_clean(x)) for x in segment.values]
+
+    op = parser.resolve_operator(segment, attribute)
+    test = OPERATOR_MAP[op](values)
+    nullable = op in NULL_OPERATORS
+    negated = segment.negated
+
+    def predicate(item):
+        # As with NULL in SQL, the result of a test that cannot compare
+        # the value (eg. `None < 3`) is unknown (`None`); the item matches
+        # neither the test nor its negation.
+        try:
+            value = get(item)
+            if value is None and not nullable:
+                return None
+
+            result = test(value)
+
+        except (TypeError, AttributeError):
+            return None
+
+        return None if result is None else result != negated
+
+    return predicate
+
+
+def noop_predicate(*args):
+    return lambda item: True
+
+
+def unary_predicate(resource, query, *args):
+    operand = build_clause(resource, query.operand, *args)
+
+    def predicate(item):
+        # An unknown result (`None`) stays unknown under negation.
+        result = operand(item)
+        return None if result is None else not result
+
+    return predicate
+
+
+def binary_predicate(resource, query, *args):
+    # Combine the results as SQL does (where `None` is unknown).
+    left = build_clause(resource, query.left, *args)
+    right = build_clause(resource, query.right, *args)
+
+    if query.operation is operator.or_:
+        def predicate(item):
+            a = left(item)
+            if a:
+                return True
+
+            b = right(item)
+            return b if b or a is not None else None
+
+    else:
+        def predicate(item):
+            a = left(item)
+            if a is False:
+                return False
+
+            b = right(item)
+            return b if b is False or a is not None else None
+
+    return predicate
+
+
+CLAUSE_MAP = {
+    parser.NoopQuerySegment: noop_predicate,
+    parser.BinarySegmentCombinator: binary_predicate,
+    parser.UnarySegmentCombinator: unary_predicate,
+    parser.QuerySegment: segment_predicate,
+}
+
+
+def build_clause(resource, query, attributes, cleaners):
+    """Compile the passed query into a predicate that accepts an item
+    and returns if the item matches the query (`None` where that is
+    unknown, which does not match).
+    """
+    class_ = type(query)
+    fn = CLAUSE_MAP.get(class_)
+    if fn is not None:
+        return fn(resource, query, attributes, cleaners)
+    elif issubclass(class_, parser.Query):
+        return build_clause(resource, query.parsed, attributes, cleaners)
+    else:
+        raise ValueError('Unable to translate query node %s' % str(query))
@@ -2,15 +2,27 @@
 from __future__ import absolute_import, unicode_literals, division
 import six
 import logging
+import operator
 from collections import Sequence, MutableSequence, Iterable
 from armet import http, pagination
 from armet.exceptions import ValidationError
+from armet.query import parser, predicate
+from armet.attributes import Attribute, IntegerAttribute, DecimalAttribute
 from armet.resources.resource import base
 
 
 logger = logging.getLogger(__name__)
 
 
+#! Functions that aggregate the items of a list (eg. `:sum=votes`); `count`
+#! counts the items (or the values of the passed attributes).
+AGGREGATES = ('count', 'sum', 'avg', 'min', 'max')
+
+#! Aggregates that are only computed over the values of numeric
+#! attributes.
+NUMERIC_AGGREGATES = ('sum', 'avg')
+
+
 class ManagedResource(base.Resource):
     """Implements the RESTful resource protocol for managed resources.
 
@@ -49,6 +61,15 @@ class ManagedResource(base.Resource):
     #! requested. None if a list is being requested.
     slug = None
 
+    # Related items read for the items being prepared (see `embedded`).
+    _embedded = ()
+
+    # Aggregates requested by the directives (see `aggregation`).
+    _aggregation = None
+
+    # Attributes faceted by the directives (see `faceting`).
+    _facets = None
+
     @classmethod
     def parse(cls, path):
         result = super(ManagedResource, cls).parse(path)
@@ -89,15 +110,377 @@ class ManagedResource(base.Resource):
         if not set(args).issubset(self.allowed_operations):
             raise http.exceptions.Forbidden()
 
+    def filter(self, clause, items):
+        """Lazily filters the items by the passed predicate."""
+        return (item for item in items if clause(item))
+
+    def filter_items(self, items):
+        """Filters the items of a list access by the query string."""
+        if self.slug is not None or not self.request.query:
+            # Nothing to filter by.
+            return items
+
+        try:
+            query = parser.parse(self.request.query)
+
+        except ValueError as ex:
+            raise http.exceptions.BadRequest({'__all__': six.text_type(ex)})
+
+        # Compile the query into a predicate and filter the items with it.
+        clause = predicate.build_clause(
+            self, query, self.attributes, self.cleaners)
+
+        return self.filter(clause, items)
+
+    def count(self, items):
+        # Return the count of the items.
+        return len(items)
+
+    def estimate(self, items):
+        # Items in memory are simply counted.
+        return self.count(items)
+
+    def projected(self, query=None):
+        """The root paths of the items to load to respond to the request;
+        `None` if the items are to be loaded entirely.
+        """
+        if self.request.method not in ('GET', 'HEAD') or self.path:
+            # Items that are written (or an attribute that may not be
+            # included) are loaded as a whole.
+            return None
+
+        if self._aggregation is not None or self._facets is not None:
+            # Aggregated items are not loaded (but computed over).
+            return None
+
+        paths = set(self.projection)
+        if query is not None:
+            # Sort keys are read from the items to build cursors.
+            for path, _ in parser.sorting(query):
+                attribute = self.attributes.get(path[0])
+                if attribute is not None and attribute.path:
+                    paths.add(attribute.path.split('.')[0])
+
+        return paths
+
+    def projecting(self):
+        """Whether the items read are to be projected onto the paths
+        returned by `projected`.
+
+        Items are loaded entirely when projection is disabled (see the
+        `projection` option) or when the resource customizes the
+        preparation of its items (or of an attribute), as that may read
+        anything from an item.
+        """
+        if not self.meta.projection or self._prepare_overridden():
+            return False
+
+        return all(
+            preparer is None for _, _, preparer, _ in self._prepare_plan)
+
+    def aggregation(self):
+        """The aggregates requested by the directives of a list access
+        (eg. `/choice:count:sum=votes:group=poll`) as a tuple of
+        `(aggregates, groups)`; `None` if nothing is aggregated.
+
+        Each aggregate is a `(function, attribute name)` tuple (the name
+        is `None` to count the items) and each group an attribute name.
+        """
+        aggregates = []
+        groups = []
+        for directive in getattr(self, 'directives', None) or ():
+            function, _, names = directive.partition('=')
+            names = [x for x in names.split(',') if x]
+            if function == 'group':
+                groups.extend(names)
+
+            elif function in AGGREGATES:
+                if not names and function != 'count':
+                    raise http.exceptions.BadRequest({
+                        '__all__': "Unable to aggregate '%s' without "
+                                   "an attribute." % function})
+
+                aggregates.extend((function, x) for x in names or [None])
+
+        if not aggregates and not groups:
+            # Nothing to aggregate.
+            return None
+
+        if not aggregates:
+            # Groups are counted unless aggregated otherwise.
+            aggregates.append(('count', None))
+
+        names = groups + [name for _, name in aggregates if name is not None]
+        for name in names:
+            attribute = self.attributes.get(name)
+            if attribute is None or not attribute.read:
+                raise http.exceptions.BadRequest({
+                    '__all__': "Unable to aggregate '%s'." % name})
+
+        for function, name in aggregates:
+            if function in NUMERIC_AGGREGATES and not isinstance(
+                    self.attributes[name],
+                    (IntegerAttribute, DecimalAttribute)):
+                raise http.exceptions.BadRequest({
+                    '__all__': "Unable to %s '%s'; it is not numeric." % (
+                        function, name)})
+
+        return aggregates, groups
+
+    def faceting(self):
+        """The names of the attributes faceted by the directives of a list
+        access (eg. `/choice:facet=poll,votes`); `None` if nothing is
+        faceted.
+        """
+        names = []
+        for directive in getattr(self, 'directives', None) or ():
+            function, _, value = directive.partition('=')
+            if function == 'facet':
+                names.extend(x for x in value.split(',') if x)
+
+        if not names:
+            # Nothing to facet.
+            return None
+
+        for name in names:
+            attribute = self.attributes.get(name)
+            if attribute is None or not attribute.read:
+                raise http.exceptions.BadRequest({
+                    '__all__': "Unable to facet by '%s'." % name})
+
+        return names
+
+    def aggregate(self, aggregates, groups, items):
+        """Aggregate the passed items; returns a row for each group (in
+        the order of the values of the groups) that holds the values of
+        the groups followed by the values of the aggregates.
+
+        Model connectors override this to aggregate in the database (as
+        a single `GROUP BY` statement).
+        """
+        # Gather the items of each group.
+        members = {}
+        for item in items:
+            key = tuple(self.attributes[x].get(item) for x in groups)
+            members.setdefault(key, []).append(item)
+
+        if not groups and not members:
+            # Nothing is aggregated into a single (empty) group.
+            members[()] = []
+
+        rows = []
+        for key in sorted(members, key=lambda x: [(y is None, y) for y in x]):
+            row = list(key)
+            for function, name in aggregates:
+                values = members[key]
+                if name is not None:
+                    get = self.attributes[name].get
+                    values = [x for x in map(get, values) if x is not None]
+
+                if function == 'count':
+                    row.append(len(values))
+
+                elif not values:
+                    # As with SQL; the aggregate of no values is null.
+                    row.append(None)
+
+                elif function == 'avg':
+                    row.append(sum(values) / len(values))
+
+                else:
+                    row.append({'sum': sum, 'min': min, 'max': max}[
+                        function](values))
+
+            rows.append(row)
+
+        return rows
+
+    def facets(self, names, limit, items):
+        """Count the distinct values of each of the passed attributes over
+        the passed items; returns a dictionary of the `(value, count)`
+        tuples of each attribute (at most `limit` of them; the most
+        frequent first).
+
+        Model connectors override this to count in the database (as a
+        `GROUP BY` statement for each attribute).
+        """
+        counts = dict((name, {}) for name in names)
+        for item in items:
+            for name in names:
+                value = self.attributes[name].get(item)
+                try:
+                    counts[name][value] = counts[name].get(value, 0) + 1
+
+                except TypeError:
+                    # The value cannot be counted (eg. a collection).
+                    pass
+
+        facets = {}
+        for name in names:
+            facets[name] = sorted(
+                six.iteritems(counts[name]),
+                key=lambda x: (-x[1], x[0] is None, x[0]))[:limit]
+
+        return facets
+
+    def faceted(self, facets):
+        """Prepare the counted values of each faceted attribute as a list
+        of `{"value": ..., "count": ...}` objects keyed by its name.
+        """
+        obj = {}
+        for name, rows in six.iteritems(facets):
+            attribute = self.attributes[name]
+            obj[attribute.name] = [{
+                'value': attribute.prepare(value)
+                if value is not None else None,
+                'count': count} for value, count in rows]
+
+        return obj
+
+    def aggregated(self, aggregates, groups, rows):
+        """Prepare the rows of an aggregate; an object for each group (or
+        one object without groups) keyed by the names of the groups and
+        of the aggregates (eg. `count` and `sum(votes)`).
+        """
+        objects = []
+        for row in rows:
+            obj = {}
+            for name, value in zip(groups, row):
+                attribute = self.attributes[name]
+                obj[attribute.name] = attribute.prepare(value)
+
+            for (function, name), value in zip(aggregates, row[len(groups):]):
+                if name is None:
+                    obj[function] = value
+                    continue
+
+                attribute = self.attributes[name]
+                if value is not None:
+                    if function == 'avg':
+                        value = float(value)
+
+                    elif function != 'count':
+                        value = attribute.prepare(value)
+
+                obj['%s(%s)' % (function, attribute.name)] = value
+
+            objects.append(obj)
+
+        return objects if groups else objects[0]
+
+    def cursor_keys(self):
+        """The sort keys that identify the position of an item in the list;
+        the sort directives of the query followed by the slug.
+        """
+        keys = []
+        if self.request.query:
+            keys = parser.sorting(parser.parse(self.request.query))
+
+        slug = (self.meta.slug.name,)
+        if not any(path == slug for path, _ in keys):
+            # The slug is unique and makes the order total.
+            keys.append((slug, False))
+
+        return keys
+
+    def _cursor_attribute(self, path):
+        attribute = self.attributes.get(path[0])
+        if attribute is None:
+            raise http.exceptions.BadRequest({
+                '__all__': "Unable to sort by '%s'." % '.'.join(path)})
+
+        if len(path) > 1:
+            # Resolve a path that extends beyond the attribute.
+            return attribute, Attribute('.'.join(
+                [attribute.path] + list(path[1:])))
+
+        return attribute, attribute
+
+    def cursor_values(self, keys, item):
+        """Retrieve the (prepared) values of the sort keys of an item."""
+        values = []
+        for path, _ in keys:
+            attribute, accessor = self._cursor_attribute(path)
+            values.append(attribute.prepare(accessor.get(item)))
+
+        return values
+
+    def cursor_clean(self, keys, values):
+        """Clean the values of the sort keys taken from a cursor; the
+        cursor is from the client and is rejected if a value is invalid.
+        """
+        cleaned = []
+        for (path, _), value in zip(keys, values):
+            try:
+                value = self._cursor_attribute(path)[0].clean(value)
+
+            except (TypeError, ValueError, AssertionError):
+                value = None
+
+            if value is None:
+                # Sort keys are not null.
+                raise http.exceptions.RequestedRangeNotSatisfiable()
+
+            cleaned.append(value)
+
+        return cleaned
+
     def make_response(self, data=None):
-        """Fills the response object from the passed data."""
+        """Fills the response object from the passed data; returns the
+        chunks to stream to the client if the list is streamed
+        (see `streaming`).
+        """
         if data is not None:
+            if self.streamed(data):
+                # Prepare and encode the items as they are sent to
+                # the client.
+                chunks, _ = self.serialize(
+                    self.prepare_stream(data),
+                    response=self.response, stream=True)
+
+                return chunks
+
             # Prepare the data for transmission.
             data = self.prepare(data)
 
             # Encode the data using a desired encoder.
             self.response.write(data, serialize=True)
 
+    def streamed(self, data):
+        """Whether the items are streamed to the client."""
+        return (self.meta.streaming
+                and self.slug is None and not self.path
+                and not self.response.asynchronous
+                and isinstance(data, Iterable)
+                and not isinstance(data, six.string_types))
+
+    def batches(self, items, size):
+        """Iterate over the items in lists of (at most) `size` items.
+
+        Model connectors override this to read the items from the database
+        a batch at a time (rather than as a whole).
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def prepare_stream(self, items):
+        """Lazily prepare the items of a streamed list; no more than a
+        batch of items (see `stream_batch_size`) is held at once.
+        """
+        for batch in self.batches(items, self.meta.stream_batch_size):
+            # Read the related items of the batch at once.
+            self._embedded = self.embedded(batch)
+
+            for item in batch:
+                yield self.item_prepare(item)
+
     def prepare(self, data):
         if data is None:
             # No data; return nothing.
@@ -114,6 +497,9 @@ class ManagedResource(base.Resource):
             if not isinstance(data, MutableSequence):
                 data = list(data)
 
+            # Read the related items of the whole page at once.
+            self._embedded = self.embedded(data)
+
             # Attempt to prepare each item of the iterable (as long as
             # we're not a string or some sort of mapping).
             for index, value in enumerate(data):
@@ -122,6 +508,7 @@ class ManagedResource(base.Resource):
             return data
 
         # Prepare just the singular value and return.
+        self._embedded = self.embedded([data])
         data = self.item_prepare(data)
         if data is None:
             raise http.exceptions.NotFound()
@@ -136,14 +523,102 @@ class ManagedResource(base.Resource):
                 # Retrieves the value from the object.
                 self, item, attribute.get(item)))
 
-    def item_prepare(self, item):
-        # If we are the root resource, clear the map.
-        if type(self) == self.request._resource.__class__:
-            self.request._embed_related.clear()
+    def embedded(self, items):
+        """Read the related items to embed in the passed items; returns a
+        list of `(name, related resource, {id(item): related items})`.
+        """
+        if self.path or type(self) != self.request._resource.__class__:
+            # Only the items of the requested resource embed related items.
+            return []
+
+        result = []
+        for name, relationship in self.relationships.items():
+            # A resource is not embedded within itself.
+            if relationship.resource is type(self):
+                continue
+
+            # If we are in list access and this is not okay for
+            # lists then skip.
+            if self.slug is None and not relationship.list:
+                continue
+
+            # Construct the related resource.
+            related = relationship.resource(self.request, self.response)
+
+            # Get the related items of every item (in one go if the
+            # connector is able).
+            values = self.read_related_many(items, related, relationship.key)
+            result.append((name, related, dict(zip(map(id, items), values))))
+
+        return result
+
+    def read_related_many(self, items, resource, key):
+        """Read the related items (on `key`) of each of the passed items;
+        connectors override this to read them in a single query.
+        """
+        return [self.read_related(item, resource, key) for item in items]
+
+    @classmethod
+    def _prepare_overridden(cls):
+        # Whether the preparation cycle of the resource is customized.
+        return any(
+            getattr(cls, name) != getattr(ManagedResource, name)
+            for name in ('prepare', 'item_prepare', 'attribute_prepare'))
 
-        # We've started doing this one.
-        self.request._embed_related.add(type(self))
+    @classmethod
+    def _compile_prepare(cls, class_):
+        """Build a function that prepares an item of the passed class into
+        an object (of the included attributes) as `attribute_prepare`
+        does for each attribute.
+        """
+        plan = cls._prepare_plan
+        names = [attribute.name for _, attribute, _, _ in plan]
+
+        if cls.attribute_prepare != ManagedResource.attribute_prepare:
+            # The preparation cycle of each attribute is customized.
+            def prepare(resource, item):
+                return dict(zip(names, [
+                    resource.attribute_prepare(key, attribute, item)
+                    for key, attribute, _, _ in plan]))
+
+            return prepare
+
+        # Resolve how each attribute is read from an item of the class.
+        getters = [attribute.getter(class_) for _, attribute, _, _ in plan]
+        if len(getters) > 1 and all(
+                isinstance(x, operator.attrgetter) for x in getters):
+            # Read every value at once.
+            fetch = operator.attrgetter(*[
+                attribute.path for _, attribute, _, _ in plan])
+
+        else:
+            fetch = lambda item: [get(item) for get in getters]
+
+        # Only the values with a preparation cycle are revisited.
+        steps = [
+            (index, preparer, attribute_prepare)
+            for index, (_, _, preparer, attribute_prepare) in enumerate(plan)
+            if preparer is not None or attribute_prepare is not None]
+
+        def prepare(resource, item):
+            values = fetch(item)
+            if steps:
+                values = list(values)
+                for index, preparer, attribute_prepare in steps:
+                    value = values[index]
+                    if preparer is not None:
+                        value = preparer(resource, item, value)
+
+                    if attribute_prepare is not None:
+                        value = attribute_prepare(value)
+
+                    values[index] = value
 
+            return dict(zip(names, values))
+
+        return prepare
+
+    def item_prepare(self, item):
         # Check for a path first.
         if self.path:
             attribute = self.attributes.get(self.path)
@@ -155,55 +630,20 @@ class ManagedResource(base.Resource):
 
             return self.attribute_prepare(self.path, attribute, item)
 
-        # Initialize the object that hold the resultant item.
-        obj = {}
-
-        # Iterate through the attributes and build the object from the item.
-        for name, attribute in self.attributes.items():
-            if attribute.include:
-                # Run the attribute through its prepare cycle.
-                obj[attribute.name] = self.attribute_prepare(
-                    name, attribute, item)
-
-        if type(self) == self.request._resource.__class__:
-            # Iterate through the relationships and build their objects.
-            # FIXME: This should be opt-in
-            for key, relationship in self.relationships.items():
-                # If we did this one; skip
-                if relationship.resource in self.request._embed_related:
-                    continue
-
-                # If we are in list access and this is not okay for
-                # lists then skip.
-                if self.slug is None and not relationship.list:
-                    continue
-
-                # Say that we did this one.
-                self.request._embed_related.add(relationship.resource)
-
-                # Construct the related resource
-                related = relationship.resource(
-                    self.request, self.response)
-                # related.require_authentication(self.request)
-
-                # Get the related items.
-                related_items = self.read_related(
-                    item, related, relationship.key)
+        # Build the object from the item through the function compiled
+        # for its class.
+        try:
+            prepare = self._item_preparers[item.__class__]
 
-                # Prepare and add to the attribute.
-                obj[key] = related.prepare(related_items)
+        except KeyError:
+            prepare = self._item_preparers[item.__class__] = (
+                self._compile_prepare(item.__class__))
 
-                # Say that we're done with this one.
-                self.request._embed_related = {
-                    x for x in self.request._embed_related
-                    if not issubclass(x, relationship.resource)
-                }
+        obj = prepare(self, item)
 
-            # TODO: Remove all that we are.
-            self.request._embed_related = {
-                x for x in self.request._embed_related
-                if not isinstance(self, x)
-            }
+        # Prepare and add the related items read for the item.
+        for name, related, values in self._embedded:
+            obj[name] = related.prepare(values[id(item)])
 
         # Return the resultant object.
         return obj
@@ -330,6 +770,33 @@ class ManagedResource(base.Resource):
         # Ensure we're allowed to read the resource.
         self.assert_operations('read')
 
+        if self.slug is None:
+            self._aggregation = self.aggregation()
+            self._facets = self.faceting()
+
+        if self._facets is not None:
+            if self._aggregation is not None:
+                raise http.exceptions.BadRequest({
+                    '__all__': 'Unable to facet an aggregate.'})
+
+            # Count the distinct values of the (filtered) items rather
+            # than respond with them.
+            items = self.filter_items(self.read())
+            facets = self.facets(self._facets, self.meta.facet_limit, items)
+            self.response.write(self.faceted(facets), serialize=True)
+
+            return
+
+        if self._aggregation is not None:
+            # Aggregate the (filtered) items rather than respond with them.
+            items = self.filter_items(self.read())
+            rows = self.aggregate(*(self._aggregation + (items,)))
+            self.response.write(
+                self.aggregated(*(self._aggregation + (rows,))),
+                serialize=True)
+
+            return
+
         # Delegate to `read` to retrieve the items.
         items = self.read()
 
@@ -345,17 +812,23 @@ class ManagedResource(base.Resource):
         #     items = self.read()
 
         # Ensure that if we have a slug and still no items that a 404
-        # is rasied appropriately.
-        if not items:
+        # is rasied appropriately. A collection is not tested for
+        # emptiness (which would read a queryset as a whole); an empty
+        # collection is responded with as such.
+        if items is None or ((self.slug is not None or self.path)
+                             and not items):
             raise http.exceptions.NotFound()
 
         if (isinstance(items, Iterable)
-                and not isinstance(items, six.string_types)) and items:
+                and not isinstance(items, six.string_types)):
+            # Filter the collection by the query string.
+            items = self.filter_items(items)
+
             # Paginate over the collection.
             items = pagination.paginate(self.request, self.response, items)
 
-        # Build the response object.
-        self.make_response(items)
+        # Build the response object (or the stream of it).
+        return self.make_response(items)
 
     def post(self, request, response):
         """Processes a `POST` request."""
@@ -4,12 +4,25 @@ import six
 import collections
 from armet.exceptions import ImproperlyConfigured
 from armet.attributes import Attribute
+from armet.query import constants
 from ..resource.meta import ResourceBase
 from armet.relationship import Relationship
 from . import options
 import copy
 
 
+def _prepare(self, obj, value):
+    # The default preparation cycle; identity.
+    return value
+
+
+def _overrides_prepare(attribute):
+    # Test if the attribute does anything to prepare a value.
+    prepare = six.get_unbound_function(type(attribute).prepare)
+    return ('prepare' in attribute.__dict__
+            or prepare is not six.get_unbound_function(Attribute.prepare))
+
+
 class ManagedResourceBase(ResourceBase):
 
     options = options.ManagedResourceOptions
@@ -41,6 +54,22 @@ class ManagedResourceBase(ResourceBase):
             if not attributes[attr].name:
                 attributes[attr].name = attr
 
+        # Resolve the operator that equality compares with on each
+        # attribute; equality on attributes that are not text is exact.
+        for attribute in six.itervalues(attributes):
+            equality = attribute.equality or self.meta.equality
+            if equality not in constants.EQUALITY_MAP:
+                raise ImproperlyConfigured(
+                    'equality of {} must be one of {}.'.format(
+                        attribute.name,
+                        ', '.join(sorted(constants.EQUALITY_MAP))))
+
+            if attribute.type is not None and not issubclass(
+                    attribute.type, six.string_types):
+                equality = constants.EQUALITY_EXACT
+
+            attribute.equality_operator = constants.EQUALITY_MAP[equality]
+
         # Resolve the slug reference to an attribute.
         if self.meta.slug not in attributes:
             if not self.meta.abstract:
@@ -55,9 +84,25 @@ class ManagedResourceBase(ResourceBase):
         for key in attributes:
             prepare = getattr(self, 'prepare_{}'.format(key), None)
             if not prepare:
-                prepare = lambda self, obj, value: value
+                prepare = _prepare
             preparers[key] = prepare
 
+        # Plan the preparation of an item from the included attributes;
+        # identity preparation cycles (of the resource and of the
+        # attribute) are left out. The plan is compiled into a function
+        # for each class of item prepared (see `item_prepare`).
+        self._prepare_plan = plan = []
+        for key, attribute in six.iteritems(attributes):
+            if attribute.include:
+                plan.append((
+                    key, attribute,
+                    preparers[key] if preparers[key] is not _prepare
+                    else None,
+                    attribute.prepare if _overrides_prepare(attribute)
+                    else None))
+
+        self._item_preparers = {}
+
         # Cache access to the attribute clean cycle.
         self.cleaners = cleaners = {}
         for key in attributes:
@@ -80,5 +125,25 @@ class ManagedResourceBase(ResourceBase):
         for attr in relationships:
             relationships[attr] = copy.copy(relationships[attr])
 
+        # Collect the root of the path of each attribute that is read to
+        # prepare an item (and of each relationship); connectors load only
+        # these from the underlying data model.
+        self.projection = projection = set()
+
+        # Collect the related paths that dotted attribute paths traverse
+        # (eg. `poll` for `poll.question`); model connectors load these
+        # eagerly.
+        self.traversals = traversals = set()
+
+        for attribute in six.itervalues(attributes):
+            if attribute.path and (
+                    attribute.include or attribute is self.meta.slug):
+                projection.add(attribute.path.split('.')[0])
+                if '.' in attribute.path:
+                    traversals.add(attribute.path.rsplit('.', 1)[0])
+
+        for relationship in six.itervalues(relationships):
+            projection.add(relationship.key.split('.')[0])
+
         # Return the constructed class object.
         return self
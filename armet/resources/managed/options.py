@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
+import six
+from armet import utils, pagination
+from armet.exceptions import ImproperlyConfigured
+from armet.query import constants
 from ..resource import options
 
 
@@ -151,3 +155,81 @@ class ManagedResourceOptions(options.ResourceOptions):
             # is the primary key. This is as good as a default as any I
             # suppose.
             self.slug = 'id'
+
+        #! Strategy used to count the items of a list for pagination; one
+        #! of `exact`, `cached` (an exact count that is cached for
+        #! `count_cache_ttl` seconds), `estimated` (the estimate of the
+        #! query planner; where available) or `none` (the items are not
+        #! counted and `Content-Range` reports an unknown length).
+        self.count_strategy = meta.get('count_strategy', 'exact')
+        if self.count_strategy not in pagination.COUNT_STRATEGIES:
+            raise ImproperlyConfigured(
+                'count_strategy must be one of %s.' % ', '.join(
+                    pagination.COUNT_STRATEGIES))
+
+        #! Strategies the client may select with a `Prefer: count=<name>`
+        #! header; defaults to the count strategy and `none`.
+        self.count_strategies = meta.get('count_strategies')
+        if self.count_strategies is None:
+            self.count_strategies = (self.count_strategy, 'none')
+
+        #! Number of seconds a cached count is retained for.
+        self.count_cache_ttl = meta.get('count_cache_ttl', 60)
+
+        #! Number of queries for which a count is cached.
+        self.count_cache_size = meta.get('count_cache_size', 128)
+        self.count_cache = utils.LRUCache(
+            self.count_cache_size, self.count_cache_ttl)
+
+        #! Number of items returned for a list access without a `Range`
+        #! header (as if the first page was requested); `None` returns
+        #! every item (or the largest page allowed by `max_page_size`).
+        self.default_page_size = meta.get('default_page_size')
+
+        #! Maximum number of items returned for a list access; requested
+        #! ranges (and cursors) are clamped to it. `None` does not limit
+        #! the number of items.
+        self.max_page_size = meta.get('max_page_size')
+
+        for name in ('default_page_size', 'max_page_size'):
+            value = getattr(self, name)
+            if value is not None and (
+                    not isinstance(value, six.integer_types) or value < 1):
+                raise ImproperlyConfigured(
+                    '%s must be a positive integer.' % name)
+
+        if self.max_page_size is not None and (
+                self.default_page_size or 0) > self.max_page_size:
+            raise ImproperlyConfigured(
+                'default_page_size must not exceed max_page_size.')
+
+        #! Whether the items of a list access are serialized (and sent to
+        #! the client) in chunks as they are encoded rather than as a
+        #! whole; a streamed response has no `Content-Length` and cannot
+        #! report an error once it has begun.
+        self.streaming = meta.get('streaming', False)
+
+        #! Number of items of a streamed list that are read (and have
+        #! their related items read) at once.
+        self.stream_batch_size = meta.get('stream_batch_size', 100)
+
+        #! Meaning of equality (`foo=bar`) on text attributes that do not
+        #! declare their own; one of `exact`, `iexact` (case-folded),
+        #! `prefix` or `substring`. Only `exact` and `iexact` (given an
+        #! index on the case-folded column) and `prefix` can be answered
+        #! by an index.
+        self.equality = meta.get('equality', constants.EQUALITY_IEXACT)
+        if self.equality not in constants.EQUALITY_MAP:
+            raise ImproperlyConfigured(
+                'equality must be one of %s.' % ', '.join(
+                    sorted(constants.EQUALITY_MAP)))
+
+        #! Maximum number of distinct values (buckets) returned for each
+        #! attribute faceted by a `:facet=foo` directive; the most
+        #! frequent values are returned first.
+        self.facet_limit = meta.get('facet_limit', 100)
+
+        #! Whether the items of a read are loaded with only the attributes
+        #! (columns) needed to respond; projection is skipped regardless
+        #! when the resource customizes the preparation of its items.
+        self.projection = meta.get('projection', True)
@@ -15,3 +15,7 @@ class ModelResource(base.ManagedResource):
         resources. Derive from `armet.resources.ModelResource` (defined in
         the `__init__.py`).
     """
+
+    def filter_items(self, items):
+        # The model connectors filter the queryset as it is read.
+        return items
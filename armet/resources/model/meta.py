@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
+from armet.exceptions import ImproperlyConfigured
 from ..managed import meta
 from . import options
 import six
@@ -25,6 +26,26 @@ class ModelResourceBase(meta.ManagedResourceBase):
             # Add this to the canonical resource dictionary.
             _canonical_resources[self.meta.model] = self
 
+        if self.meta and getattr(self, 'attributes', None) is not None:
+            # Declare the attributes that may be searched.
+            for key, index in six.iteritems(self.meta.search):
+                if key not in self.attributes:
+                    raise ImproperlyConfigured(
+                        'search must reference existing attributes')
+
+                self.attributes[key].search = index
+
+        if self.meta and getattr(self, 'traversals', None) is not None:
+            # Plan how each traversed relationship is loaded.
+            self.loaders = loaders = []
+            for path in sorted(self.traversals):
+                strategy = self.meta.eager_loading
+                if isinstance(strategy, dict):
+                    strategy = strategy.get(path, 'join')
+
+                if strategy != 'lazy':
+                    loaders.append((path, strategy))
+
         # Return the constructed class object.
         return self
 
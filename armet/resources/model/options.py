@@ -4,6 +4,12 @@ from armet.exceptions import ImproperlyConfigured
 from ..managed import options
 
 
+#! Strategies to load the relationships traversed by dotted attribute
+#! paths: in the same query (`join`), in a query per relationship
+#! (`select`) or as each item is accessed (`lazy`).
+EAGER_LOADING_STRATEGIES = ('join', 'select', 'lazy')
+
+
 class ModelResourceOptions(options.ManagedResourceOptions):
 
     def __init__(self, meta, name, data, bases):
@@ -16,3 +22,33 @@ class ModelResourceOptions(options.ManagedResourceOptions):
         if self.model is None and not self.abstract:
             raise ImproperlyConfigured(
                 'Model resources must be bound to a model.')
+
+        #! Strategy used to load the relationships traversed by dotted
+        #! attribute paths (eg. `poll` for `poll.question`); one of `join`,
+        #! `select` or `lazy`. May be a mapping of paths to strategies
+        #! to choose per path (any other path is joined).
+        self.eager_loading = meta.get('eager_loading', 'join')
+
+        strategies = self.eager_loading
+        if isinstance(strategies, dict):
+            strategies = strategies.values()
+
+        else:
+            strategies = strategies,
+
+        for strategy in strategies:
+            if strategy not in EAGER_LOADING_STRATEGIES:
+                raise ImproperlyConfigured(
+                    'eager_loading must be one of %s.' % ', '.join(
+                        EAGER_LOADING_STRATEGIES))
+
+        #! Attributes that may be searched (`foo.search=bar`) in addition to
+        #! those that declare `search`; either a sequence of attribute
+        #! names or a mapping of attribute names to full-text indexes.
+        self.search = meta.get('search') or {}
+        if not isinstance(self.search, dict):
+            self.search = dict.fromkeys(self.search, True)
+
+        #! Text search configuration used to search on PostgreSQL; must
+        #! be that of the index (eg. `to_tsvector('english', question)`).
+        self.search_config = meta.get('search_config', 'english')
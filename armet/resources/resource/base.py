@@ -233,14 +233,11 @@ class Resource(object):
                     yield data['chunk']
 
                 else:
-                    # Write the chunk to the response
-                    response.send(data['chunk'])
-
-                    # Yield its body
-                    yield response.body
-
-                    # Unset the body.
-                    response.body = None
+                    # Write the chunk to the response and yield it (along
+                    # with anything else written since the last chunk).
+                    chunk = response.drain(data['chunk'])
+                    if chunk:
+                        yield chunk
 
                 try:
                     # Get the next chunk.
@@ -251,6 +248,11 @@ class Resource(object):
                     break
 
             if not response.asynchronous:
+                # Yield anything written after the last chunk.
+                chunk = response.drain()
+                if chunk:
+                    yield chunk
+
                 # Close the response.
                 response.close()
 
@@ -326,7 +328,8 @@ class Resource(object):
         raise http.exceptions.UnsupportedMediaType()
 
     @utils.boundmethod
-    def serialize(self, data, response=None, request=None, format=None):
+    def serialize(self, data, response=None, request=None, format=None,
+                  stream=False):
         """Serializes the data using a determined serializer.
 
         @param[in] data
@@ -349,6 +352,11 @@ class Resource(object):
             done. If not provided, the accept header (as well as the URL
             extension) is looked at to determine an appropriate serializer.
 
+        @param[in] stream
+            True to serialize the items of the data incrementally; the
+            serialized text is an iterable of chunks to write to the
+            response (see `stream`).
+
         @returns
             A tuple of the serialized text and an instance of the
             serializer used.
@@ -392,6 +400,9 @@ class Resource(object):
                 # Attempt to serialize the data using the determined
                 # serializer.
                 serializer = Serializer(request, response)
+                if stream:
+                    return serializer.stream(data), serializer
+
                 return serializer.serialize(data), serializer
 
             except ValueError:
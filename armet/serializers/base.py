@@ -43,3 +43,19 @@ class Serializer(object):
         # Return the serialized data.
         # This has normally been transformed by a base class.
         return data
+
+    def stream(self, data):
+        """
+        Transforms the items of an iterable into a sequence of chunks that
+        are written to the response as they are produced (normally
+        through `Resource.stream`).
+
+        The default serializes the data as a whole; the (single) chunk
+        is `None` as the data has been written to the response.
+
+        @throws ValueError
+            To indicate this serializer does not support the encoding of the
+            specified object.
+        """
+        self.serialize(data)
+        return [None]
@@ -2,6 +2,7 @@
 from __future__ import absolute_import, unicode_literals, division
 import six
 import ujson as json
+from itertools import islice
 from collections import Iterable, Sequence, Mapping
 from .base import Serializer
 from armet import media_types
@@ -11,6 +12,18 @@ class JSONSerializer(Serializer):
 
     media_types = media_types.JSON
 
+    #! Number of items encoded into each chunk of a stream.
+    chunk_size = 100
+
+    def dumps(self, obj):
+        """Encode the object as JSON.
+
+        Override to plug in another encoder; the encoded object may be
+        returned as text or as UTF-8 encoded bytes (eg. from `orjson`),
+        which are written to the response as they are.
+        """
+        return json.dumps(obj, ensure_ascii=False)
+
     def serialize(self, obj=None):
         # If we have nothing; serialize as an empty object.
         if obj is None:
@@ -27,7 +40,49 @@ class JSONSerializer(Serializer):
             obj = [obj]
 
         # Serialize the resultant text.
-        text = json.dumps(obj, ensure_ascii=False)
+        text = self.dumps(obj)
 
         # Return us to the base to enclose it inside of a response object.
         return super(JSONSerializer, self).serialize(text)
+
+    def stream(self, data):
+        if (data is None or isinstance(data, six.string_types)
+                or isinstance(data, Mapping)
+                or not isinstance(data, Iterable)):
+            # Not a collection; serialize as a whole.
+            return super(JSONSerializer, self).stream(data)
+
+        if self.response is not None:
+            # Set the content type.
+            self.response['Content-Type'] = self.media_types[0]
+
+        return self._chunks(iter(data))
+
+    def _chunks(self, items):
+        # Encode the items a chunk at a time so that the response is not
+        # flushed for every item (each chunk is encoded as an array and
+        # spliced into the whole); a chunk is held until the next is read
+        # so that the last one closes the array.
+        pending = None
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                break
+
+            text = self.dumps(chunk)
+            if pending is None:
+                # Open the array (the brackets are of the type of text
+                # the encoder returns).
+                text, close = text[:-1], text[-1:]
+
+            else:
+                yield pending
+                separator = (
+                    b',' if isinstance(text, six.binary_type) else ',')
+
+                text = separator + text[1:-1]
+
+            pending = text
+
+        # Close the array (or send an empty one).
+        yield pending + close if pending is not None else self.dumps([])
@@ -4,6 +4,7 @@ from .decorators import classproperty, boundmethod
 from .functional import cons, compose
 from .string import dasherize
 from .package import import_module
+from .cache import LRUCache, lru_cache
 
 __all__ = [
     'classproperty',
@@ -12,4 +13,6 @@ __all__ = [
     'compose',
     'import_module',
     'dasherize',
+    'LRUCache',
+    'lru_cache',
 ]
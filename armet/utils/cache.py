@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals, division
+import time
+import functools
+import threading
+from collections import OrderedDict, namedtuple
+
+
+#! Statistics reported by a cache (named after `functools.lru_cache`).
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+#! Sentinel used to distinguish a cached `None` from a miss.
+_missing = object()
+
+
+class LRUCache(object):
+    """A bounded, thread-safe mapping that discards the least recently
+    used entry once it holds more than `maxsize` entries.
+
+    Entries may optionally expire `ttl` seconds after they are set.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        #! Maximum number of entries to retain.
+        self.maxsize = maxsize
+
+        #! Number of seconds an entry is retained for (forever if `None`).
+        self.ttl = ttl
+
+        #! Number of lookups that found an entry.
+        self.hits = 0
+
+        #! Number of lookups that did not find an entry.
+        self.misses = 0
+
+        # Entries ordered from the least to the most recently used.
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Retrieve the entry for the passed key and mark it as used."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None or (
+                    entry[0] is not None and entry[0] <= time.time()):
+                # Not found (or expired and discarded).
+                self.misses += 1
+                return default
+
+            # Re-insert the entry as the most recently used.
+            self._data[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def __setitem__(self, key, value):
+        # Entries are stored along with the time they expire.
+        expires = time.time() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = expires, value
+
+            if len(self._data) > self.maxsize:
+                # Discard the least recently used entry.
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and (
+            entry[0] is None or entry[0] > time.time())
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Report the hit and miss counts of the cache."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+
+def lru_cache(maxsize=128):
+    """Memoizes a function of hashable positional arguments.
+
+    The decorated function exposes `cache_info()` and `cache_clear()`
+    in the manner of `functools.lru_cache` (which is not available on
+    all supported versions of python).
+    """
+
+    def decorator(function):
+        cache = LRUCache(maxsize)
+
+        @functools.wraps(function)
+        def wrapper(*args):
+            result = cache.get(args, _missing)
+            if result is _missing:
+                result = cache[args] = function(*args)
+
+            return result
+
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
 import sys
+import json
 from importlib import import_module
 from wsgi_intercept.httplib2_intercept import install
 import pytest
 import armet
-from armet import test
+from armet import test, http
+from .utils import capture_statements
 
 
 class BaseResourceTest(object):
@@ -58,3 +60,21 @@ class BaseResourceTest(object):
 
         # Add a finalizer to teardown the http layer.
         request.addfinalizer(lambda: http.http_teardown(self.host, self.port))
+
+    def request_ids(self, path):
+        # Request the path and return the identifiers of the items.
+        response, content = self.client.request(path)
+
+        assert response.status == http.client.OK
+
+        return [x['id'] for x in json.loads(content.decode('utf-8'))]
+
+    def count_selects(self, connectors, path):
+        # Request the path and return the number of queries issued.
+        with capture_statements(connectors) as statements:
+            response, _ = self.client.request(path)
+
+        assert response.status == http.client.OK
+
+        return len([x for x, _ in statements
+                    if x.lower().startswith('select')])
@@ -7,10 +7,11 @@ from wsgi_intercept.httplib2_intercept import install
 # Setup the environment variables.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'tests.connectors.django.settings'
 
-from .models import Poll
+from .models import Poll, Choice
 
 __all__ = [
-    'Poll'
+    'Poll',
+    'Choice',
 ]
 
 
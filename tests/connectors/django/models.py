@@ -10,3 +10,12 @@ class Poll(models.Model):
     available = models.NullBooleanField()
 
     votes = models.IntegerField(null=True)
+
+
+class Choice(models.Model):
+
+    poll = models.ForeignKey(Poll, related_name='choices')
+
+    choice = models.CharField(max_length=1024)
+
+    votes = models.IntegerField(null=True)
@@ -2,8 +2,9 @@
 from __future__ import absolute_import, unicode_literals, division
 import sys
 import json
+import six
 import armet
-from armet import resources, attributes, exceptions
+from armet import resources, attributes, exceptions, serializers
 
 # Request the generic models module inserted by the test runner.
 models = sys.modules['tests.connectors.models']
@@ -12,6 +13,23 @@ __all__ = [
     'SimpleResource',
     'SimpleTrailingResource',
     'PollResource',
+    'ChoiceResource',
+    'PollChoicesResource',
+    'ChoicePollResource',
+    'ChoiceCountResource',
+    'ChoiceSelectResource',
+    'ChoiceIexactResource',
+    'PollPrefixResource',
+    'PollSearchResource',
+    'ChoiceFacetResource',
+    'PollPageResource',
+    'PollMaxPageResource',
+    'PollUnprojectedResource',
+    'PollPreparedResource',
+    'PollStreamResource',
+    'PollChoicesStreamResource',
+    'PollBytesResource',
+    'CurrencyResource',
     'StreamingResource',
     'AsyncResource',
     'AsyncStreamResource',
@@ -197,6 +215,161 @@ class PollResource(resources.ModelResource):
     available = attributes.BooleanAttribute('available')
 
 
+class ChoiceResource(resources.ModelResource):
+
+    class Meta:
+        model = models.Choice
+
+        slug = 'id'
+
+    id = attributes.IntegerAttribute('id')
+
+    choice = attributes.TextAttribute('choice')
+
+    votes = attributes.IntegerAttribute('votes')
+
+    question = attributes.TextAttribute('poll.question')
+
+
+class ChoiceCountResource(ChoiceResource):
+
+    class Meta:
+        count_strategy = 'cached'
+
+        count_strategies = ('cached', 'estimated', 'none')
+
+
+class ChoiceSelectResource(ChoiceResource):
+
+    class Meta:
+        eager_loading = {'poll': 'select'}
+
+
+class ChoiceIexactResource(ChoiceResource):
+
+    class Meta:
+        equality = 'iexact'
+
+
+class PollPrefixResource(PollResource):
+
+    question = attributes.TextAttribute('question', equality='prefix')
+
+
+class PollSearchResource(PollResource):
+
+    question = attributes.TextAttribute('question', search='poll_fts')
+
+
+class ChoiceFacetResource(ChoiceResource):
+
+    class Meta:
+        facet_limit = 2
+
+
+class PollPageResource(PollResource):
+
+    class Meta:
+        default_page_size = 10
+
+        max_page_size = 20
+
+
+class PollMaxPageResource(PollResource):
+
+    class Meta:
+        max_page_size = 20
+
+
+class PollUnprojectedResource(PollResource):
+
+    class Meta:
+        projection = False
+
+
+class PollPreparedResource(PollResource):
+
+    def prepare_question(self, item, value):
+        # Reads a column that is not an attribute.
+        return '%s (%s)' % (value, item.votes)
+
+
+class PollStreamResource(PollResource):
+
+    class Meta:
+        streaming = True
+
+        stream_batch_size = 7
+
+
+class PollChoicesResource(PollResource):
+
+    choices = armet.Relationship('choices', ChoiceResource, list=True)
+
+    choice_votes = attributes.IntegerAttribute('choices.votes', include=False)
+
+
+class PollChoicesStreamResource(PollChoicesResource):
+
+    class Meta:
+        streaming = True
+
+        stream_batch_size = 7
+
+
+class UTF8JSONSerializer(serializers.JSONSerializer):
+
+    def dumps(self, obj):
+        # Encode as UTF-8 bytes (as would a backend such as `orjson`).
+        text = super(UTF8JSONSerializer, self).dumps(obj)
+        if isinstance(text, six.binary_type):
+            return text
+
+        return text.encode('utf-8')
+
+
+class PollBytesResource(PollResource):
+
+    class Meta:
+        serializers = {'json': UTF8JSONSerializer}
+
+
+class ChoicePollResource(ChoiceResource):
+
+    poll = armet.Relationship('poll', PollResource, list=True)
+
+
+class CurrencyResource(resources.ManagedResource):
+
+    class Meta:
+        slug = 'code'
+
+    #! An in-memory lookup table.
+    CURRENCIES = [
+        {'code': 'USD', 'name': 'US Dollar', 'digits': 2},
+        {'code': 'EUR', 'name': 'Euro', 'digits': 2},
+        {'code': 'JPY', 'name': 'Yen', 'digits': 0},
+        {'code': 'KWD', 'name': 'Kuwaiti Dinar', 'digits': 3},
+        {'code': 'XAU', 'name': 'Gold', 'digits': None},
+    ]
+
+    code = attributes.TextAttribute('code')
+
+    name = attributes.TextAttribute('name')
+
+    digits = attributes.IntegerAttribute('digits')
+
+    def read(self):
+        if self.slug is not None:
+            for item in self.CURRENCIES:
+                if item['code'] == self.slug:
+                    return item
+
+            return None
+
+        return self.CURRENCIES
+
+
 class LeftResource(resources.Resource):
 
     class Meta:
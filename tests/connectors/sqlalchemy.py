@@ -30,6 +30,21 @@ class Poll(Base):
     votes = sa.Column(sa.Integer)
 
 
+class Choice(Base):
+
+    __tablename__ = 'choice'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+
+    poll_id = sa.Column('poll', sa.Integer, sa.ForeignKey('poll.id'))
+
+    poll = orm.relationship(Poll, backref='choices')
+
+    choice = sa.Column(sa.String(1024))
+
+    votes = sa.Column(sa.Integer)
+
+
 def _load_fixture(filename):
     """
     Loads the passed fixture into the database following the
@@ -69,5 +84,12 @@ def model_setup():
     # Load the data fixture.
     _load_fixture(os.path.join(os.path.dirname(__file__), 'data.json'))
 
+    # Index the questions of the polls for full-text search.
+    engine.execute('DROP TABLE IF EXISTS poll_fts')
+    engine.execute(
+        "CREATE VIRTUAL TABLE poll_fts USING fts5("
+        "question, content='poll', content_rowid='id')")
+    engine.execute("INSERT INTO poll_fts(poll_fts) VALUES ('rebuild')")
+
     # Configure armet and provide the session factory.
     armet.use(Session=Session)
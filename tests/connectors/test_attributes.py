@@ -23,6 +23,20 @@ class TestResourceAttributeProperties(BaseResourceTest):
         assert response.status == http.client.OK
         assert content.decode('utf8') == '["Are you an innie or an outie?"]'
 
+    def test_not_include_list_sorted(self):
+        response, content = self.client.get('/api/poll/?question:desc')
+        expected = [x['id'] for x in json.loads(content.decode('utf8'))]
+
+        response, content = self.client.get(
+            '/api/poll-exclude/?question:desc')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf8'))
+
+        assert [x['id'] for x in data] == expected
+        assert all('question' not in x for x in data)
+
     def test_not_read(self):
         response, content = self.client.get('/api/poll-unread/1/question/')
 
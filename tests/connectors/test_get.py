@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import sys
 import json
 from armet import http
 from .base import BaseResourceTest
+from .utils import capture_statements
 from pytest import mark
 
 
@@ -43,6 +45,40 @@ class TestResourceGet(BaseResourceTest):
         assert (data['question'] ==
                 'What one question would you add to this survey?')
 
+    def selected(self, connectors, path):
+        # The columns of polls selected to respond to a request.
+        with capture_statements(connectors) as statements:
+            response, _ = self.client.request(path)
+
+        assert response.status == http.client.OK
+
+        return [statement.lower().split(' from ')[0]
+                for statement, _ in statements
+                if statement.lower().startswith('select')]
+
+    def test_list_projected(self, connectors):
+        selected = self.selected(connectors, '/api/poll/')
+
+        assert selected
+        assert all('question' in x for x in selected)
+        assert not any('votes' in x for x in selected)
+
+    def test_list_projection_disabled(self, connectors):
+        selected = self.selected(connectors, '/api/poll-unprojected/')
+
+        assert any('votes' in x for x in selected)
+
+    def test_list_projection_prepared(self, connectors):
+        selected = self.selected(connectors, '/api/poll-prepared/')
+
+        assert any('votes' in x for x in selected)
+
+        response, content = self.client.request('/api/poll-prepared/1/')
+        data = json.loads(content.decode('utf-8'))
+
+        assert data['question'].startswith('Are you an innie or an outie?')
+        assert data['question'].endswith(')')
+
 
 @mark.bench('self.client.request', iterations=1000)
 class TestResourceQuery(BaseResourceTest):
@@ -90,6 +126,113 @@ class TestResourceQuery(BaseResourceTest):
         assert len(data) == 2
         assert data[0]['question'] == 'Are you an innie or an outie?'
 
+    def test_param_eq_many(self, connectors):
+        ids = ','.join(map(str, range(2000, 0, -3)))
+        response, content = self.client.request('/api/poll/?id==' + ids)
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == list(range(2, 101, 3))
+
+    def test_param_eq_many_negated(self, connectors):
+        response, content = self.client.request('/api/poll/?id!=3,1,2')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) == 97
+        assert data[0]['id'] == 4
+
+        response, content = self.client.request('/api/poll/?!(id=3,1,2)')
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) == 97
+
+    def test_param_in(self, connectors):
+        response, content = self.client.request('/api/poll/?id.in=9,3')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [3, 9]
+
+    def test_param_between(self, connectors):
+        response, content = self.client.request(
+            '/api/poll/?id.between=10,12')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [10, 11, 12]
+
+        response, content = self.client.request(
+            '/api/poll/?id.between=10')
+
+        assert response.status == http.client.BAD_REQUEST
+
+    def test_param_startswith(self, connectors):
+        response, content = self.client.request(
+            '/api/poll/?question.startswith=Are')
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) > 0
+        assert all(x['question'].startswith('Are') for x in data)
+
+        response, content = self.client.request(
+            '/api/poll/?question.istartswith=are;question.startswith=Have')
+        data = json.loads(content.decode('utf-8'))
+
+        assert any(x['question'].startswith('Have') for x in data)
+        assert all(x['question'][:3] in ('Are', 'Hav') for x in data)
+
+    def test_param_startswith_escaped(self, connectors):
+        response, content = self.client.request(
+            '/api/poll/?question.startswith=A_e;id=2')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [2]
+
+    def test_param_equality_iexact(self, connectors):
+        response, content = self.client.request(
+            '/api/choice-iexact/?choice=e,YES;id=7')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [3, 5, 7]
+
+    def test_param_equality_prefix(self, connectors):
+        response, content = self.client.request(
+            '/api/poll-prefix/?question=are')
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) > 0
+        assert all(x['question'].startswith('Are') for x in data)
+
+        response, content = self.client.request(
+            '/api/poll-prefix/?question=song;id=1')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [1]
+
+    def test_param_regex(self, connectors):
+        response, content = self.client.request(
+            '/api/poll/?question*=^[AH][ra][ev]')
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) > 1
+        assert all(x['question'][:3] in ('Are', 'Hav') for x in data)
+
+        response, content = self.client.request(
+            '/api/poll/?question!*=[?]$;id=1')
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['id'] for x in data] == [1, 19]
+
+    def test_param_regex_refused(self, connectors):
+        for pattern in ('[a', 'a**', 'a' * 1000):
+            response, content = self.client.request(
+                '/api/poll/?question*=' + pattern)
+
+            assert response.status == http.client.BAD_REQUEST
+
     def test_param_gt_one(self, connectors):
         response, content = self.client.request('/api/poll/?id>99')
 
@@ -123,6 +266,250 @@ class TestResourceQuery(BaseResourceTest):
         assert isinstance(data, list)
         assert len(data) == 4
 
+    def test_param_malformed(self, connectors):
+        response, _ = self.client.request('/api/poll/?id=1&&id=2')
+
+        assert response.status == http.client.BAD_REQUEST
+
+    def test_param_values_table(self, connectors):
+        # Large sets are not bound one parameter each (SQLite allows 999
+        # parameters before 3.32, SQL Server 2100).
+        ids = range(1, 1501)
+        query = 'id=' + ','.join(map(str, ids))
+        with capture_statements(connectors) as statements:
+            for _ in range(2):
+                # The table of values is dropped once the request ends.
+                assert self.request_ids('/api/poll/?' + query) == list(
+                    range(1, 101))
+
+            negated = self.request_ids('/api/poll/?id!=' + ','.join(
+                map(str, [x for x in ids if x not in (7, 42)])))
+
+            assert negated == [7, 42]
+
+        if connectors['model'] == 'sqlalchemy':
+            assert max(len(x or ()) for _, x in statements) < 999
+
+    def test_param_shape_cached(self, connectors):
+        if connectors['model'] != 'sqlalchemy':
+            return
+
+        resources = sys.modules['tests.connectors.resources']
+        cache = resources.PollResource.meta.clause_cache
+        cache.clear()
+
+        for query in ('id>99', 'id>98', 'question.icontains=innie',
+                      'question.icontains=peeve'):
+            response, content = self.client.request('/api/poll/?' + query)
+
+            assert response.status == http.client.OK
+
+            data = json.loads(content.decode('utf-8'))
+
+            # A cached clause must not retain the values it was built with.
+            assert len(data) == (2 if query == 'id>98' else 1)
+
+        assert cache.info().hits == 2
+        assert cache.info().misses == 2
+
+
+@mark.bench('self.client.request', iterations=1000)
+class TestResourceSearch(BaseResourceTest):
+
+    def test_search(self, connectors):
+        ids = self.request_ids('/api/poll-search/?question.search=written')
+
+        assert ids == [2, 5, 8]
+
+    def test_search_words(self, connectors):
+        ids = self.request_ids(
+            '/api/poll-search/?question.search=written+song')
+
+        assert ids == [2]
+
+    def test_search_any(self, connectors):
+        ids = self.request_ids(
+            '/api/poll-search/?question.search=song,innie&id:asc')
+
+        assert ids == [1, 2]
+
+    def test_search_negated(self, connectors):
+        ids = self.request_ids(
+            '/api/poll-search/?question.search.not=ever&id<5')
+
+        assert ids == [1, 3]
+
+    def test_search_rank(self, connectors):
+        path = '/api/poll-search/?question.search:rank=song,innie'
+        if connectors['model'] == 'django':
+            # Django has no relevance to order by.
+            response, _ = self.client.request(path)
+
+            assert response.status == http.client.BAD_REQUEST
+            return
+
+        # The more relevant (to the first search) poll comes first.
+        ids = self.request_ids(path)
+
+        assert ids == [2, 1]
+
+    def test_search_undeclared(self, connectors):
+        response, _ = self.client.request('/api/poll/?question.search=song')
+
+        assert response.status == http.client.BAD_REQUEST
+
+
+@mark.bench('self.client.request', iterations=1000)
+class TestResourceSort(BaseResourceTest):
+
+    def request(self, url, **kwargs):
+        response, content = self.client.request(url, **kwargs)
+
+        assert response.status in (http.client.OK,
+                                   http.client.PARTIAL_CONTENT)
+
+        return response, json.loads(content.decode('utf-8'))
+
+    def test_sort_ascending(self, connectors):
+        _, data = self.request('/api/poll/?question:asc')
+
+        assert len(data) == 100
+        assert data[0]['question'] == (
+            'Among your friends, who could you arm wrestle and beat?')
+
+    def test_sort_descending(self, connectors):
+        _, data = self.request('/api/poll/?id:desc')
+
+        assert [x['id'] for x in data[:3]] == [100, 99, 98]
+
+    def test_sort_multiple(self, connectors):
+        _, data = self.request('/api/poll/?available:desc&id:asc')
+
+        assert [x['id'] for x in data[:8]] == [1, 3, 5, 7, 2, 4, 6, 8]
+
+    def test_sort_filter_range(self, connectors):
+        response, data = self.request(
+            '/api/poll/?id>90&id:desc', headers={'Range': 'items=0-1'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert [x['id'] for x in data] == [100, 99]
+
+    def test_sort_relationship(self, connectors):
+        _, data = self.request('/api/choice/?question:desc&votes:asc')
+
+        assert [x['id'] for x in data] == [7, 3, 4, 6, 5, 2, 1]
+
+    def test_sort_unknown(self, connectors):
+        response, _ = self.client.request('/api/poll/?bogus:asc')
+
+        assert response.status == http.client.BAD_REQUEST
+
+    def test_sort_related_many(self, connectors):
+        # An item may have any number of choices to be ordered by.
+        response, _ = self.client.request(
+            '/api/poll-choices/?choice_votes:asc')
+
+        assert response.status == http.client.BAD_REQUEST
+
+
+@mark.bench('self.client.request', iterations=1000)
+class TestResourceMemoryQuery(BaseResourceTest):
+
+    def request_codes(self, query, **kwargs):
+        response, content = self.client.request(
+            '/api/currency/?' + query, **kwargs)
+
+        assert response.status in (http.client.OK,
+                                   http.client.PARTIAL_CONTENT)
+
+        data = json.loads(content.decode('utf-8'))
+
+        return response, [x['code'] for x in data]
+
+    def test_param_iexact(self, connectors):
+        _, codes = self.request_codes('code=usd,jpy')
+
+        assert codes == ['USD', 'JPY']
+
+    def test_param_gt(self, connectors):
+        _, codes = self.request_codes('digits>=2')
+
+        assert codes == ['USD', 'EUR', 'KWD']
+
+    def test_param_negated(self, connectors):
+        _, codes = self.request_codes('digits!=2')
+
+        assert codes == ['JPY', 'KWD', 'XAU']
+
+    def test_param_regex(self, connectors):
+        _, codes = self.request_codes('name*=^[EY]')
+
+        assert codes == ['EUR', 'JPY']
+
+    def test_param_in_between(self, connectors):
+        _, codes = self.request_codes('code.in=JPY,EUR')
+
+        assert codes == ['EUR', 'JPY']
+
+        _, codes = self.request_codes('digits.between=1,2')
+
+        assert codes == ['USD', 'EUR']
+
+    def test_param_startswith(self, connectors):
+        _, codes = self.request_codes('name.startswith=K;name.istartswith=us')
+
+        assert codes == ['USD', 'KWD']
+
+    def test_param_isnull(self, connectors):
+        _, codes = self.request_codes('digits.isnull=true')
+
+        assert codes == ['XAU']
+
+    def test_param_combined(self, connectors):
+        # Combinators apply from left to right.
+        _, codes = self.request_codes('!(digits=2)&code=xau;code=eur')
+
+        assert codes == ['EUR', 'XAU']
+
+    def test_param_negated_unknown(self, connectors):
+        # A null value is not comparable; it matches no comparison
+        # (nor its negation).
+        _, codes = self.request_codes('!(digits>0)')
+
+        assert codes == ['JPY']
+
+    def test_param_empty(self, connectors):
+        _, codes = self.request_codes('code=aud')
+
+        assert codes == []
+
+    def test_param_search(self, connectors):
+        _, codes = self.request_codes('name.search=dollar+us,gold')
+
+        assert codes == ['USD', 'XAU']
+
+    def test_param_range(self, connectors):
+        response, codes = self.request_codes(
+            'digits>0', headers={'Range': 'items=1-1'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert response['content-range'] == '1-1/3'
+        assert codes == ['EUR']
+
+    def test_param_malformed(self, connectors):
+        response, _ = self.client.request('/api/currency/?digits>0&')
+
+        assert response.status == http.client.OK
+
+        response, _ = self.client.request('/api/currency/?(digits>0')
+
+        assert response.status == http.client.BAD_REQUEST
+
+    def test_param_unknown(self, connectors):
+        response, _ = self.client.request('/api/currency/?bogus=1')
+
+        assert response.status == http.client.BAD_REQUEST
+
 
 @mark.bench('self.client.request', iterations=1000)
 class TestResourceTraversal(BaseResourceTest):
@@ -167,6 +554,313 @@ class TestResourceTraversal(BaseResourceTest):
         assert response.status == http.client.NOT_FOUND
 
 
+@mark.bench('self.client.request', iterations=1000)
+class TestResourceRelationship(BaseResourceTest):
+
+    def test_list_embedded(self, connectors):
+        response, content = self.client.request('/api/poll-choices/?id<=4')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+        choices = [sorted(x['id'] for x in y['choices']) for y in data]
+
+        assert choices == [[1, 2], [3, 4], [5, 6], []]
+        assert data[0]['choices'][0]['question'] == data[0]['question']
+
+    def test_list_embedded_queries(self, connectors):
+        # The items and then their related items are read at once
+        # (whatever the number of items).
+        assert self.count_selects(connectors, '/api/poll-choices/?id<=4') == 2
+        assert self.count_selects(connectors, '/api/poll-choices/?id<=40') == 2
+        assert self.count_selects(connectors, '/api/poll-choices/2/') == 2
+
+    def test_single_embedded(self):
+        response, content = self.client.request('/api/poll-choices/2/')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert sorted(x['choice'] for x in data['choices']) == ['No', 'Yes']
+
+    def test_list_embedded_scalar(self):
+        response, content = self.client.request(
+            '/api/choice-poll/?votes>20')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['poll']['id'] for x in data] == [1, 2]
+        assert data[0]['poll']['question'] == data[0]['question']
+
+    def test_list_embedded_scalar_queries(self, connectors):
+        # The related item may already be loaded along with the item.
+        for path in '/api/choice-poll/?votes>20', '/api/choice-poll/':
+            assert self.count_selects(connectors, path) <= 2
+
+
+class TestResourceJoinedQuery(BaseResourceTest):
+
+    def test_param_related(self):
+        ids = self.request_ids('/api/choice/?question>V;votes<5')
+
+        assert ids == [3, 7]
+
+    def test_param_related_many(self):
+        ids = self.request_ids('/api/poll-choices/?choice_votes>10')
+
+        assert ids == [1, 2, 3]
+
+    def test_param_related_many_shared(self):
+        # Both segments must hold for the same choice.
+        ids = self.request_ids(
+            '/api/poll-choices/?choice_votes>10&choice_votes<20')
+
+        assert ids == [1, 3]
+
+    def test_param_related_many_negated(self):
+        # No related row may match; items without related rows match.
+        ids = self.request_ids('/api/poll-choices/?!(choice_votes>10)&id<=5')
+
+        assert ids == [4, 5]
+
+        ids = self.request_ids('/api/poll-choices/?choice_votes!>10&id<=5')
+
+        assert ids == [4, 5]
+
+    def test_param_related_many_negated_mixed(self):
+        # Items with some related rows that match (and some that do
+        # not) are excluded.
+        ids = self.request_ids('/api/poll-choices/?!(choice_votes<5)&id<=5')
+        expected = self.request_ids('/api/poll-choices/?choice_votes<5')
+
+        assert expected and ids == [
+            x for x in [1, 2, 3, 4, 5] if x not in expected]
+
+
+class TestResourceAggregate(BaseResourceTest):
+
+    def request_data(self, path):
+        response, content = self.client.request(path)
+
+        assert response.status == http.client.OK
+
+        return json.loads(content.decode('utf-8'))
+
+    def test_count(self):
+        data = self.request_data('/api/choice:count/')
+
+        assert data == {'count': 7}
+
+    def test_aggregate_filtered(self):
+        data = self.request_data('/api/choice:min=votes:avg=votes/')
+
+        assert data['min(votes)'] == 2
+        assert abs(data['avg(votes)'] - 107.0 / 7) < 1e-6
+
+        data = self.request_data('/api/choice:count:sum=votes/?votes>20')
+
+        assert data == {'count': 2, 'sum(votes)': 54}
+
+    def test_aggregate_grouped(self):
+        data = self.request_data(
+            '/api/choice:sum=votes:max=votes:group=question/?votes>3')
+
+        assert [x['question'][:3] for x in data] == ['Are', 'Can', 'Hav']
+        assert [x['sum(votes)'] for x in data] == [35, 35, 35]
+        assert [x['max(votes)'] for x in data] == [23, 18, 31]
+
+    def test_aggregate_group_counted(self):
+        data = self.request_data('/api/choice:group=question/?votes>3')
+
+        assert [x['count'] for x in data] == [2, 2, 2]
+
+    def test_aggregate_related_many(self):
+        # The items that match through a join to many are counted once.
+        data = self.request_data('/api/poll-choices:count/?choice_votes>10')
+
+        assert data == {'count': 3}
+
+    def test_aggregate_invalid(self):
+        for path in ('/api/choice:sum/', '/api/choice:sum=bogus/',
+                     '/api/choice:group=bogus/'):
+            response, _ = self.client.request(path)
+
+            assert response.status == http.client.BAD_REQUEST
+
+    def test_aggregate_not_numeric(self):
+        # Only numeric attributes are summed or averaged.
+        for path in ('/api/choice:sum=choice/', '/api/choice:avg=question/',
+                     '/api/currency:sum=code/'):
+            response, _ = self.client.request(path)
+
+            assert response.status == http.client.BAD_REQUEST
+
+        data = self.request_data('/api/choice:max=choice/?votes>20')
+
+        assert data == {'max(choice)': 'No'}
+
+    def test_aggregate_memory(self):
+        data = self.request_data('/api/currency:count:sum=digits/?digits>0')
+
+        assert data == {'count': 3, 'sum(digits)': 7}
+
+
+class TestResourceFacet(BaseResourceTest):
+
+    def request_data(self, path):
+        response, content = self.client.request(path)
+
+        assert response.status == http.client.OK
+
+        return json.loads(content.decode('utf-8'))
+
+    def test_facet(self):
+        data = self.request_data('/api/choice:facet=question/?votes>3')
+
+        assert list(data) == ['question']
+        assert [x['value'][:3] for x in data['question']] == [
+            'Are', 'Can', 'Hav']
+        assert [x['count'] for x in data['question']] == [2, 2, 2]
+
+    def test_facet_limit(self):
+        data = self.request_data('/api/choice-facet:facet=question,choice/')
+
+        assert data['choice'] == [
+            {'value': 'No', 'count': 2}, {'value': 'Yes', 'count': 2}]
+        assert [x['value'][:3] for x in data['question']] == ['Are', 'Can']
+
+    def test_facet_invalid(self):
+        for path in ('/api/choice:facet=bogus/',
+                     '/api/choice:facet=votes:count/'):
+            response, _ = self.client.request(path)
+
+            assert response.status == http.client.BAD_REQUEST
+
+    def test_facet_memory(self):
+        data = self.request_data('/api/currency:facet=digits/')
+
+        assert data == {'digits': [
+            {'value': 2, 'count': 2}, {'value': 0, 'count': 1},
+            {'value': 3, 'count': 1}, {'value': None, 'count': 1}]}
+
+
+class TestResourceBytes(BaseResourceTest):
+
+    def test_list(self):
+        # The serializer encodes straight to UTF-8 bytes.
+        _, content = self.client.request('/api/poll/')
+        expected = json.loads(content.decode('utf-8'))
+
+        response, content = self.client.request('/api/poll-bytes/')
+
+        assert response.status == http.client.OK
+        assert response['content-type'] == 'application/json'
+        assert int(response['content-length']) == len(content)
+        assert json.loads(content.decode('utf-8')) == expected
+
+    def test_single(self):
+        response, content = self.client.request('/api/poll-bytes/1/')
+        data = json.loads(content.decode('utf-8'))
+
+        assert response.status == http.client.OK
+        assert data['id'] == 1
+
+
+class TestResourceStreaming(BaseResourceTest):
+
+    def test_list(self):
+        _, content = self.client.request('/api/poll/')
+        expected = json.loads(content.decode('utf-8'))
+
+        response, content = self.client.request('/api/poll-stream/')
+
+        assert response.status == http.client.OK
+        assert response['content-type'] == 'application/json'
+        assert 'content-length' not in response
+        assert json.loads(content.decode('utf-8')) == expected
+
+    def test_list_embedded(self):
+        # Related items are read for each batch.
+        _, content = self.client.request('/api/poll-choices/')
+        expected = json.loads(content.decode('utf-8'))
+
+        response, content = self.client.request('/api/poll-choices-stream/')
+
+        assert response.status == http.client.OK
+        assert json.loads(content.decode('utf-8')) == expected
+
+    def test_list_queries(self, connectors):
+        # The items are read once (through a cursor) and their related
+        # items a batch (of 7) at a time.
+        with capture_statements(connectors) as statements:
+            response, content = self.client.request(
+                '/api/poll-choices-stream/')
+
+        assert response.status == http.client.OK
+        assert len(json.loads(content.decode('utf-8'))) == 100
+
+        tables = [x.lower().split(' from ')[1].split()[0].strip('"`')
+                  for x, _ in statements if x.lower().startswith('select')]
+
+        assert len([x for x in tables if x.endswith('poll')]) == 1
+        assert len([x for x in tables if x.endswith('choice')]) == 15
+
+    def test_list_range(self):
+        response, content = self.client.request(
+            path='/api/poll-stream/',
+            headers={
+                'range': 'items=10-20'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) == 11
+        assert data[0]['question'] == 'What is your biggest pet peeve?'
+
+    def test_single(self):
+        response, content = self.client.request('/api/poll-stream/1/')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert data['question'] == 'Are you an innie or an outie?'
+
+
+class TestResourceEagerLoading(BaseResourceTest):
+
+    def test_list_joined(self):
+        response, content = self.client.request('/api/choice/?id:asc')
+
+        assert response.status == http.client.OK
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert [x['question'] for x in data[:3]] == [
+            'Are you an innie or an outie?',
+            'Are you an innie or an outie?',
+            'Have you ever written a song?']
+
+    def test_list_joined_queries(self, connectors):
+        assert self.count_selects(connectors, '/api/choice/') == 1
+
+    def test_list_selected(self):
+        _, content = self.client.request('/api/choice/')
+        expected = json.loads(content.decode('utf-8'))
+
+        response, content = self.client.request('/api/choice-select/')
+
+        assert response.status == http.client.OK
+        assert json.loads(content.decode('utf-8')) == expected
+
+    def test_list_selected_queries(self, connectors):
+        assert self.count_selects(connectors, '/api/choice-select/') == 2
+
+
 @mark.bench('self.client.request', iterations=1000)
 class TestResourcePagination(BaseResourceTest):
 
@@ -195,3 +889,231 @@ class TestResourcePagination(BaseResourceTest):
 
         assert len(data) == 1
         assert data[0]['question'] == 'What is your biggest pet peeve?'
+
+    def test_get_default_page(self):
+        response, content = self.client.request('/api/poll-page/')
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert response['content-range'] == '0-9/100'
+        assert len(json.loads(content.decode('utf-8'))) == 10
+
+    def test_get_default_page_empty(self):
+        # An empty list is not paged.
+        response, content = self.client.request('/api/poll-page/?id>1000')
+
+        assert response.status == http.client.OK
+        assert 'content-range' not in response
+        assert json.loads(content.decode('utf-8')) == []
+
+        response, content = self.client.request(
+            path='/api/poll/?id>1000',
+            headers={
+                'range': 'items=0-9'})
+
+        assert response.status == http.client.OK
+        assert json.loads(content.decode('utf-8')) == []
+
+    def test_get_default_page_queries(self, connectors):
+        # Only the page is read (rather than every item).
+        with capture_statements(connectors) as statements:
+            response, _ = self.client.request('/api/poll-page/')
+
+        assert response.status == http.client.PARTIAL_CONTENT
+
+        selects = [x.lower() for x, _ in statements
+                   if x.lower().startswith('select')
+                   and 'count(' not in x.lower()]
+
+        assert selects
+        assert all(' limit ' in x for x in selects)
+
+    def test_get_max_page(self):
+        # Without a default page size, the largest page is the first.
+        response, content = self.client.request('/api/poll-max-page/')
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert response['content-range'] == '0-19/100'
+        assert len(json.loads(content.decode('utf-8'))) == 20
+
+    def test_get_range_clamped(self):
+        response, content = self.client.request(
+            path='/api/poll-page/',
+            headers={
+                'range': 'items=10-89'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert response['content-range'] == '10-29/100'
+
+        data = json.loads(content.decode('utf-8'))
+
+        assert len(data) == 20
+        assert data[0]['question'] == 'What is your biggest pet peeve?'
+
+    def test_get_cursor_clamped(self):
+        response, content = self.client.request(
+            path='/api/poll-page/',
+            headers={
+                'range': 'cursor=50'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert len(json.loads(content.decode('utf-8'))) == 20
+
+        response, content = self.client.request(
+            path='/api/poll-page/',
+            headers={
+                'range': 'cursor=99999999999999999999'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert len(json.loads(content.decode('utf-8'))) == 20
+
+    def test_get_range_uncounted(self):
+        response, content = self.client.request(
+            path='/api/poll/',
+            headers={
+                'range': 'items=95-104',
+                'prefer': 'count=none'})
+
+        assert response.status == http.client.PARTIAL_CONTENT
+        assert response['content-range'] == '95-99/*'
+        assert response['preference-applied'] == 'count=none'
+        assert len(json.loads(content.decode('utf-8'))) == 5
+
+        response, _ = self.client.request(
+            path='/api/poll/',
+            headers={
+                'range': 'items=100-104',
+                'prefer': 'count=none'})
+
+        assert response.status == http.client.REQUESTED_RANGE_NOT_SATISFIABLE
+
+    def test_get_range_preference_ignored(self):
+        response, _ = self.client.request(
+            path='/api/poll/',
+            headers={
+                'range': 'items=10-20',
+                'prefer': 'count=estimated'})
+
+        assert response['content-range'] == '10-20/100'
+        assert 'preference-applied' not in response
+
+    def test_get_range_cached(self, connectors):
+        # The resources are mounted (and reloaded) by the first request.
+        self.client.request('/api/choice-count/1/')
+
+        resources = sys.modules['tests.connectors.resources']
+        cache = resources.ChoiceCountResource.meta.count_cache
+        cache.clear()
+
+        for hits in range(2):
+            with capture_statements(connectors) as statements:
+                response, _ = self.client.request(
+                    path='/api/choice-count/?votes>10',
+                    headers={
+                        'range': 'items=0-1'})
+
+            assert response.status == http.client.PARTIAL_CONTENT
+            assert response['content-range'] == '0-1/5'
+            assert cache.hits == hits
+
+        # The second request is answered from the cached count.
+        assert not [x for x, _ in statements if 'count(' in x.lower()]
+
+    def test_get_range_estimated(self):
+        response, _ = self.client.request(
+            path='/api/choice-count/',
+            headers={
+                'range': 'items=0-1',
+                'prefer': 'count=estimated'})
+
+        assert response['content-range'] == '0-1/7'
+        assert response['preference-applied'] == 'count=estimated'
+
+    def test_get_range_unbounded(self, connectors):
+        # Whatever the count, only the requested range of items is read.
+        for strategy in 'none', 'estimated':
+            with capture_statements(connectors) as statements:
+                response, _ = self.client.request(
+                    path='/api/choice-count/',
+                    headers={
+                        'range': 'items=0-1',
+                        'prefer': 'count=' + strategy})
+
+            assert response.status == http.client.PARTIAL_CONTENT
+
+            selects = [x.lower() for x, _ in statements
+                       if x.lower().startswith('select')
+                       and 'count(' not in x.lower()]
+
+            assert selects
+            assert all(' limit ' in x for x in selects)
+
+            if strategy == 'none':
+                assert not [x for x, _ in statements
+                            if 'count(' in x.lower()]
+
+    def walk_cursor(self, path, limit):
+        pages = []
+        cursor = str(limit)
+        while cursor:
+            response, content = self.client.request(
+                path=path,
+                headers={
+                    'range': 'cursor=' + cursor})
+
+            assert response.status == http.client.PARTIAL_CONTENT
+
+            data = json.loads(content.decode('utf-8'))
+            pages.append([x['id'] for x in data])
+            cursor = response.get('cursor')
+
+        return pages
+
+    def test_get_cursor(self):
+        pages = self.walk_cursor('/api/poll/', 40)
+
+        assert pages == [
+            list(range(1, 41)), list(range(41, 81)), list(range(81, 101))]
+
+    def test_get_cursor_sorted(self):
+        response, content = self.client.request('/api/poll/?question:desc')
+        expected = [x['id'] for x in json.loads(content.decode('utf-8'))]
+
+        pages = self.walk_cursor('/api/poll/?question:desc', 30)
+
+        assert list(map(len, pages)) == [30, 30, 30, 10]
+        assert sum(pages, []) == expected
+
+    def test_get_cursor_filtered(self):
+        pages = self.walk_cursor('/api/poll/?id>90&id:desc', 5)
+
+        assert pages == [[100, 99, 98, 97, 96], [95, 94, 93, 92, 91]]
+
+    def test_get_cursor_boolean(self):
+        pages = self.walk_cursor('/api/poll/?id<9&available:desc', 3)
+
+        assert pages == [[1, 3, 5], [7, 2, 4], [6, 8]]
+
+    def test_get_cursor_relationship(self):
+        pages = self.walk_cursor('/api/choice/?question:asc', 2)
+
+        assert sum(pages, []) == [1, 2, 5, 6, 3, 4, 7]
+
+    def test_get_cursor_invalid(self):
+        # A value that is not an identifier and a limit that overflows.
+        for cursor in ('0', 'bogus', '!', 'WzMsWyJ4Il1d',
+                       '99999999999999999999'):
+            response, _ = self.client.request(
+                path='/api/poll/',
+                headers={
+                    'range': 'cursor=' + cursor})
+
+            assert response.status == (
+                http.client.REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_get_cursor_unsupported(self):
+        response, _ = self.client.request(
+            path='/api/currency/',
+            headers={
+                'range': 'cursor=2'})
+
+        assert response.status == http.client.REQUESTED_RANGE_NOT_SATISFIABLE
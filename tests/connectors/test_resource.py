@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import armet
 from armet import exceptions, resources
+from armet.query import constants
 from .base import BaseResourceTest
 import pytest
 import json
@@ -13,6 +14,100 @@ class TestResource(BaseResourceTest):
             class Resource(resources.ModelResource):
                 pass
 
+    def test_eager_loading_plan(self, connectors):
+        class Resource(resources.ModelResource):
+            class Meta:
+                model = self.models.Choice
+                eager_loading = {'poll': 'select'}
+
+            id = armet.attributes.IntegerAttribute('id')
+            question = armet.attributes.TextAttribute('poll.question')
+            hidden = armet.attributes.TextAttribute(
+                'poll.choices', include=False)
+
+        assert Resource.traversals == {'poll'}
+        assert Resource.loaders == [('poll', 'select')]
+
+    def test_eager_loading_invalid(self, connectors):
+        with pytest.raises(exceptions.ImproperlyConfigured):
+            class Resource(resources.ModelResource):
+                class Meta:
+                    model = self.models.Choice
+                    eager_loading = 'eager'
+
+    def test_equality_exact_not_text(self, connectors):
+        class Resource(resources.ModelResource):
+            class Meta:
+                model = self.models.Choice
+                equality = 'prefix'
+
+            id = armet.attributes.IntegerAttribute('id', equality='iexact')
+            choice = armet.attributes.TextAttribute('choice')
+
+        operators = constants.OPERATOR_MAP
+        assert Resource.attributes['id'].equality_operator is operators[
+            constants.OPERATOR_EQUAL]
+        assert Resource.attributes['choice'].equality_operator is operators[
+            constants.OPERATOR_ISTARTSWITH]
+
+    def test_equality_default(self, connectors):
+        class Resource(resources.ModelResource):
+            class Meta:
+                model = self.models.Choice
+
+            choice = armet.attributes.TextAttribute('choice')
+
+        # Every connector compares text case-insensitively by default.
+        assert Resource.attributes['choice'].equality_operator is (
+            constants.OPERATOR_MAP[constants.OPERATOR_IEQUAL])
+
+    def test_equality_invalid(self, connectors):
+        with pytest.raises(exceptions.ImproperlyConfigured):
+            class Resource(resources.ModelResource):
+                class Meta:
+                    model = self.models.Choice
+                    equality = 'like'
+
+        with pytest.raises(exceptions.ImproperlyConfigured):
+            class Resource(resources.ModelResource):
+                class Meta:
+                    model = self.models.Choice
+
+                choice = armet.attributes.TextAttribute(
+                    'choice', equality='like')
+
+    def test_page_size_invalid(self, connectors):
+        for meta in ({'default_page_size': 0},
+                     {'default_page_size': 50, 'max_page_size': 20}):
+            with pytest.raises(exceptions.ImproperlyConfigured):
+                class Resource(resources.ModelResource):
+                    Meta = type(str('Meta'), (), dict(
+                        meta, model=self.models.Choice))
+
+    def test_search_declared(self, connectors):
+        class Resource(resources.ModelResource):
+            class Meta:
+                model = self.models.Choice
+                search = ('choice',)
+
+            id = armet.attributes.IntegerAttribute('id')
+            choice = armet.attributes.TextAttribute('choice')
+            question = armet.attributes.TextAttribute(
+                'poll.question', search='poll_fts')
+            votes = armet.attributes.IntegerAttribute('votes')
+
+        assert Resource.attributes['choice'].search is True
+        assert Resource.attributes['question'].search == 'poll_fts'
+        assert not Resource.attributes['votes'].search
+
+        with pytest.raises(exceptions.ImproperlyConfigured):
+            class Resource(resources.ModelResource):
+                class Meta:
+                    model = self.models.Choice
+                    search = ('bogus',)
+
+                id = armet.attributes.IntegerAttribute('id')
+
     def test_connectorless_resource(self, connectors):
         # Unset configuration.
         old = armet.use.config
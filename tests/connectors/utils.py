@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals, division
 import sys
+from contextlib import contextmanager
 from six.moves import reload_module
 from importlib import import_module
 
@@ -16,3 +17,63 @@ def force_import_module(name):
 def unload_module(name):
     if name in sys.modules:
         del sys.modules[name]
+
+
+#! Lists collecting the statements executed on the engines of the
+#! SQLAlchemy models (see `capture_statements`).
+_capturing = []
+
+#! Engines listened to (by identity).
+_engines = set()
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if executemany:
+        # Record the parameters of a single execution.
+        parameters = parameters[0]
+
+    for statements in _capturing:
+        statements.append((statement, parameters))
+
+
+@contextmanager
+def capture_statements(connectors):
+    """Collect the SQL statements executed (by either model connector)
+    within the block as `(statement, parameters)` tuples; the parameters
+    are `None` on django.
+    """
+    statements = []
+    if connectors['model'] == 'sqlalchemy':
+        from sqlalchemy import event
+        engine = sys.modules['tests.connectors.models'].engine
+        if id(engine) not in _engines:
+            # Listeners cannot be removed (on all supported versions);
+            # the listener only records while capturing.
+            event.listen(engine, 'before_cursor_execute', _capture)
+            _engines.add(id(engine))
+
+        _capturing.append(statements)
+        try:
+            yield statements
+
+        finally:
+            _capturing.remove(statements)
+
+        return
+
+    # Record the queries of django without resetting them as each
+    # request is started.
+    from django.core import signals
+    from django.db import connection, reset_queries
+    signals.request_started.disconnect(reset_queries)
+    debug, connection.use_debug_cursor = connection.use_debug_cursor, True
+    start = len(connection.queries)
+    try:
+        yield statements
+
+    finally:
+        statements.extend(
+            (x['sql'], None) for x in connection.queries[start:])
+
+        connection.use_debug_cursor = debug
+        signals.request_started.connect(reset_queries)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals, division
+import unittest
+import decimal
+from armet import resources, attributes
+from pytest import mark
+
+
+class Row(object):
+    # Slots are data descriptors (as are the columns of a mapped model).
+    __slots__ = ('id', 'name', 'active', 'cost', 'secret')
+
+    def __init__(self, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, kwargs.get(name))
+
+
+class Resource(resources.ManagedResource):
+
+    class Meta:
+        abstract = True
+
+    id = attributes.IntegerAttribute('id')
+
+    name = attributes.TextAttribute('name')
+
+    active = attributes.BooleanAttribute('active')
+
+    cost = attributes.DecimalAttribute('cost')
+
+    secret = attributes.TextAttribute('secret', include=False)
+
+    def prepare_name(self, item, value):
+        return value.upper()
+
+
+def rows(count):
+    return [dict(
+        id=index, name='item %d' % index, active=bool(index % 2),
+        cost=decimal.Decimal(index) / 4, secret='-') for index in range(count)]
+
+
+@mark.bench('self.item_prepare', iterations=10000)
+class PrepareTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Resources are constructed through traversal of a request.
+        self.resource = object.__new__(Resource)
+        self.resource.path = None
+
+    def item_prepare(self, item):
+        return self.resource.item_prepare(item)
+
+    def attribute_prepare(self, item):
+        # Run each attribute through the whole preparation cycle.
+        return dict(
+            (attribute.name, self.resource.attribute_prepare(
+                name, attribute, item))
+            for name, attribute in self.resource.attributes.items()
+            if attribute.include)
+
+    def test_objects(self):
+        for item in [Row(**x) for x in rows(50)]:
+            assert self.item_prepare(item) == (
+                self.attribute_prepare(item))
+
+        assert self.item_prepare(Row(**rows(6)[5])) == {
+            'id': 5, 'name': 'ITEM 5', 'active': True, 'cost': '1.25'}
+
+    def test_mappings(self):
+        for item in rows(50):
+            assert self.item_prepare(item) == (
+                self.attribute_prepare(item))
+
+        assert self.item_prepare(rows(7)[6]) == {
+            'id': 6, 'name': 'ITEM 6', 'active': False, 'cost': '1.5'}
+
+    def test_attribute_prepare(self):
+        # A customized preparation cycle is still run for each attribute.
+        class Custom(Resource):
+
+            class Meta:
+                abstract = True
+
+            def attribute_prepare(self, name, attribute, item):
+                return name
+
+        resource = object.__new__(Custom)
+        resource.path = None
+
+        assert resource.item_prepare(rows(1)[0]) == {
+            'id': 'id', 'name': 'name', 'active': 'active', 'cost': 'cost'}
@@ -22,16 +22,16 @@ class QueryTestCase(unittest.TestCase):
     def test_simple_filter(self):
         item = self.parse('foo=bar')
 
-        assert item.path == ['foo']
+        assert item.path == ('foo',)
         assert item.operator, constants.OPERATOR_IEQUAL[0]
         assert not item.negated
-        assert item.values == ['bar']
+        assert item.values == ('bar',)
 
     def test_binary(self):
         item = self.parse(b'foo=bar')
 
-        assert item.path == ['foo']
-        assert item.values == ['bar']
+        assert item.path == ('foo',)
+        assert item.values == ('bar',)
 
     def test_negation(self):
         queries = ['foo!=bar', 'foo.not=bar']
@@ -43,18 +43,18 @@ class QueryTestCase(unittest.TestCase):
     def test_relational_filter(self):
         item = self.parse('bread.sticks=delicious')
 
-        assert item.path == ['bread', 'sticks']
+        assert item.path == ('bread', 'sticks')
         assert item.operator, constants.OPERATOR_IEQUAL[0]
         assert not item.negated
-        assert item.values == ['delicious']
+        assert item.values == ('delicious',)
 
     def test_values(self):
         item = self.parse('fruit=apples,oranges')
 
-        assert item.path == ['fruit']
+        assert item.path == ('fruit',)
         assert item.operator, constants.OPERATOR_IEQUAL[0]
         assert not item.negated
-        assert item.values == ['apples', 'oranges']
+        assert item.values == ('apples', 'oranges')
 
     def test_bogus(self):
         """Test some bogusy query strings."""
@@ -69,20 +69,54 @@ class QueryTestCase(unittest.TestCase):
 
     def test_operations(self):
         for name, symbol in constants.OPERATORS:
+            if (name, symbol) == constants.OPERATOR_BETWEEN:
+                # A range takes two values (see `test_between`).
+                continue
+
             item = self.parse('crazy.{}=true'.format(name))
 
-            assert item.path == ['crazy']
+            assert item.path == ('crazy',)
             assert item.operator == constants.OPERATOR_SUFFIX_MAP[name]
             assert not item.negated
-            assert item.values == ['true']
+            assert item.values == ('true',)
 
             if symbol is not None:
                 item = self.parse('crazy{}true'.format(symbol))
 
-                assert item.path == ['crazy']
+                assert item.path == ('crazy',)
                 assert item.operator == constants.OPERATOR_EQUALITY_MAP[symbol]
                 assert not item.negated
-                assert item.values == ['true']
+                assert item.values == ('true',)
+
+    def test_between(self):
+        item = self.parse('created.between=2013-01-01,2013-12-31')
+
+        assert item.path == ('created',)
+        assert item.operator == constants.OPERATOR_SUFFIX_MAP['between']
+        assert item.values == ('2013-01-01', '2013-12-31')
+
+        for query in ['created.between=2013', 'created.between=1,2,3']:
+            self.assertRaises(ValueError, self.parse, query)
+
+    def test_regex(self):
+        item = self.parse('name*=^[a-z]+$')
+
+        assert item.operator == constants.OPERATOR_EQUALITY_MAP['*=']
+        assert item.values == ('^[a-z]+$',)
+
+        for query in ['name*=[a-z', 'name*=a**', 'name.regex=' + 'a' * 257]:
+            self.assertRaises(ValueError, self.parse, query)
+
+    def test_regex_backtracking(self):
+        # Patterns that may backtrack exponentially are refused (groups
+        # cannot be given through the query string; the patterns are
+        # validated directly).
+        for pattern in ['(a+)+$', '(a*)*b', '(.*a){3,}$', '(ab|a)*$',
+                        '(a)\\1', '(?=(a+)+)']:
+            self.assertRaises(ValueError, parser.validate_regex, pattern)
+
+        for pattern in ['^[a-z]+$', '(ab)+c', '(?:a|b)+', 'a{0,1}b*']:
+            parser.validate_regex(pattern)
 
     def test_fusion(self):
         """Test something from everything combined"""
@@ -93,13 +127,135 @@ class QueryTestCase(unittest.TestCase):
 
         # I'm lazy and don't want to walk the tree, so lets just test the repr.
         assert (six.text_type(repr(item)) ==
-                "(the.rolling.stones.iregex.not:asc :iexact 'sympathy' "
+                "(not the.rolling.stones.iregex :iexact 'sympathy' "
                 "| 'for' | 'the' | 'devil') OR NOT (guns.n.roses :iexact "
-                "'paradise' | 'city') AND (queen :iexact '')")
+                "'paradise' | 'city') AND (queen)")
 
     def test_grouping(self):
         item = self.parse('foo=bar&(a=b;b=c)')
 
-        assert item.left.path == ['foo']
-        assert item.right.left.path == ['a']
-        assert item.right.right.path == ['b']
+        assert item.left.path == ('foo',)
+        assert item.right.left.path == ('a',)
+        assert item.right.right.path == ('b',)
+
+    def test_negated_path(self):
+        for query in ['foo!=bar', 'foo.not=bar', 'foo.gte.not=3']:
+            item = self.parse(query)
+
+            assert item.path == ('foo',)
+            assert item.negated
+
+    def test_directives(self):
+        item = self.parse('foo.bar:asc:nulls>3')
+
+        assert item.path == ('foo', 'bar')
+        assert item.directives == ('asc', 'nulls')
+        assert item.operator == constants.OPERATOR_EQUALITY_MAP['>']
+        assert item.values == ('3',)
+
+    def test_directives_only(self):
+        item = self.parse('foo:desc')
+
+        assert item.path == ('foo',)
+        assert item.directives == ('desc',)
+        assert item.values == ()
+
+    def test_trailing_combinator(self):
+        item = self.parse('foo=bar&')
+
+        assert item.left.path == ('foo',)
+        assert isinstance(item.right, parser.NoopQuerySegment)
+
+    def test_unbalanced(self):
+        queries = [
+            '(foo=bar',
+            'foo=bar)',
+            '(foo=bar))',
+            '()',
+            '(foo=bar)baz=1',
+            'foo=bar(baz=1)',
+            'foo',
+            'foo..bar=1',
+            '=1',
+        ]
+        for query in queries:
+            self.assertRaises(ValueError, self.parse, query)
+
+    def test_error_position(self):
+        with self.assertRaises(ValueError) as context:
+            self.parse('foo=bar&(a=b;;b=c)')
+
+        assert 'position 13' in str(context.exception)
+
+    def test_sorting(self):
+        query = parser.parse('foo:desc&(bar.baz:asc=1;!(qux:asc))&quux>1')
+
+        assert parser.sorting(query) == [
+            (('foo',), True), (('bar', 'baz'), False), (('qux',), False)]
+
+    def test_immutable(self):
+        item = self.parse('foo=bar&(a=b;b=c)')
+
+        with self.assertRaises(AttributeError):
+            item.left = None
+
+        with self.assertRaises(AttributeError):
+            item.right.left.negated = True
+
+    def test_equality(self):
+        a = self.parse('foo=bar&(a=b;b=c)')
+        b = parser.split_segments('foo=bar&(a=b;b=c)')
+
+        assert a == b
+        assert hash(a) == hash(b)
+        assert a != self.parse('foo=bar&(a=b;b=d)')
+
+    def test_depth(self):
+        # Queries are compared (and cached) recursively; their depth is
+        # limited.
+        depth = constants.QUERY_MAX_DEPTH
+        text = '&'.join(['foo=bar'] * depth)
+
+        assert self.parse(text) == parser.split_segments(text)
+
+        with self.assertRaises(ValueError):
+            self.parse(text + '&foo=bar')
+
+        with self.assertRaises(ValueError):
+            self.parse('!(' * depth + 'foo=bar' + ')' * depth)
+
+
+@mark.bench('parser.split_segments', iterations=100)
+class SplitSegmentsTestCase(unittest.TestCase):
+
+    def test_long_values(self):
+        values = list(map(six.text_type, range(5000)))
+        item = parser.split_segments('foo=' + ','.join(values))
+
+        assert item.values == tuple(values)
+
+    def test_long_conjunction(self):
+        text = '&'.join('foo.bar{}=baz'.format(x) for x in range(60))
+        item = parser.split_segments(text)
+
+        assert item.right == parser.split_segments('foo.bar59=baz')
+
+    def test_deep_grouping(self):
+        depth = 10000
+        item = parser.split_segments('(' * depth + 'foo=bar' + ')' * depth)
+
+        assert item == parser.split_segments('foo=bar')
+
+
+class QueryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        parser.parse.cache_clear()
+
+    def test_cached(self):
+        query = parser.parse('foo=bar&(a=b;b=c)')
+
+        assert parser.parse('foo=bar&(a=b;b=c)') is query
+        assert parser.parse(b'foo=bar&(a=b;b=c)') is query
+        assert parser.parse.cache_info().hits == 2
+        assert parser.parse.cache_info().misses == 1
@@ -72,6 +72,19 @@ class TestJSONSerializer(TestSerializer):
 
         assert self.content == '[0,1,2,3,4,5,6,7,8,9]'
 
+    def test_stream(self):
+        self.serializer.chunk_size = 4
+        try:
+            chunks = list(self.serializer.stream(x for x in range(10)))
+
+        finally:
+            del self.serializer.chunk_size
+
+        assert chunks == ['[0,1,2,3', ',4,5,6,7', ',8,9]']
+
+    def test_stream_empty(self):
+        assert list(self.serializer.stream(iter(()))) == ['[]']
+
     def test_large(self):
         payload_item = {
             'organization': uuid.uuid4().hex,
@@ -95,6 +108,46 @@ class TestJSONSerializer(TestSerializer):
         assert self.content == json.dumps(payload, ensure_ascii=False)
 
 
+class UTF8JSONSerializer(serializers.JSONSerializer):
+
+    def dumps(self, obj):
+        # Encode as UTF-8 bytes (as would a backend such as `orjson`).
+        text = super(UTF8JSONSerializer, self).dumps(obj)
+        if isinstance(text, six.binary_type):
+            return text
+
+        return text.encode('utf-8')
+
+
+@mark.bench('self.serializer.serialize', iterations=10000)
+class TestUTF8JSONSerializer(TestJSONSerializer):
+
+    Serializer = UTF8JSONSerializer
+
+    def test_bytes(self):
+        content = self.serializer.serialize(['ünïcödé'])
+
+        assert isinstance(content, six.binary_type)
+        assert content.decode('utf-8') == '["ünïcödé"]'
+
+    def test_stream(self):
+        self.serializer.chunk_size = 4
+        try:
+            chunks = list(self.serializer.stream(
+                'ünïcödé %d' % x for x in range(10)))
+
+        finally:
+            del self.serializer.chunk_size
+
+        assert all(isinstance(x, six.binary_type) for x in chunks)
+        assert len(chunks) == 3
+        assert json.loads(b''.join(chunks).decode('utf-8')) == [
+            'ünïcödé %d' % x for x in range(10)]
+
+    def test_stream_empty(self):
+        assert list(self.serializer.stream(iter(()))) == [b'[]']
+
+
 @mark.bench('self.serializer.serialize', iterations=10000)
 class TestURLSerializer(TestSerializer):
 
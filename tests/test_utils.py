@@ -57,3 +57,29 @@ class TestDasherize:
 
     def test_dashed(self):
         assert utils.dasherize('dashed-words') == 'dashed-words'
+
+
+class TestLRUCache:
+
+    def test_evict(self):
+        cache = utils.LRUCache(2)
+        cache['x'] = 10
+        cache['y'] = 20
+
+        # Use 'x' so that 'y' is the least recently used.
+        assert cache.get('x') == 10
+
+        cache['z'] = 30
+
+        assert 'x' in cache
+        assert 'y' not in cache
+        assert 'z' in cache
+        assert cache.info() == (1, 0, 2, 2)
+
+    def test_expire(self):
+        cache = utils.LRUCache(2, ttl=0)
+        cache['x'] = 10
+
+        assert 'x' not in cache
+        assert cache.get('x') is None
+        assert cache.info().misses == 1